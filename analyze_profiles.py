@@ -1,9 +1,12 @@
-import pandas as pd
-from profiles import compute_profiles
+import argparse
+
+from streaming import stream_profiles, CHUNKSIZE
+
+from profiles import ProfileReport
 
 from profiles import plot_bartle_compass
 
-from profiles import save_yee_radar_png
+from profiles import save_yee_radars
 
 from profiles import print_user_stats
 
@@ -11,32 +14,61 @@ from profiles import plot_top_games_with_genres
 
 from profiles import plot_genre_distribution_histogram
 
-from exploration import print_unique_tags
+from exploration import print_tag_lists
+
+from metrics import metrics, report_path
+
+
+#profiles of every participant, plots=False only prints the tags and the stats
+#returns yee_df, bartle_df and stats
+def run_profiles(path=None, chunksize=CHUNKSIZE, plots=True, output_dir="output"):
+    #reads the data in chunks and calculates profiles for yee and bartle, user stats and unique tags
+    metrics.mark("read")
+    yee_df, bartle_df, stats, all_genres, all_categories = stream_profiles(path, chunksize=chunksize)
+
+    #print the listed unique tags of the games
+    print_tag_lists(all_genres, all_categories)
+
+    if plots:
+        #normalized profiles, group means and percentiles, shared by the compass and the radars
+        report = ProfileReport(yee_df, bartle_df)
+
+        #save bartle compass
+        metrics.mark("bartle")
+        plot_bartle_compass(bartle_df, save_path=f"{output_dir}/bartle_compass.png", report=report)
 
-#upload data from csv
-df = pd.read_csv("data/steam_data.csv")
+        #save yee radar for each user (rendered in parallel)
+        metrics.mark("yee")
+        print("User:", list(yee_df.index))
+        save_yee_radars(yee_df, output_dir, report=report)
 
-#calculate profiles for yee and bartle
-yee_df, bartle_df = compute_profiles(df)
+    #print stats for different users (computed once, reused by the plots)
+    metrics.mark("stats")
+    print_user_stats(None, stats)
+    stats.to_json(f"{output_dir}/user_stats.json", orient="index", force_ascii=False, indent=1)
 
-#print the listed unique tags of the games
-print_unique_tags(df)
+    if plots:
+        #save top games and genres graph
+        metrics.mark("plots")
+        plot_top_games_with_genres(None, output_dir, stats=stats)
+        #save genre distribution grapg
+        plot_genre_distribution_histogram(None, output_dir, stats=stats)
 
-#save bartle compass
-plot_bartle_compass(bartle_df)
+    #run report with the time of every stage
+    metrics.save(report_path("profiles"))
+    return yee_df, bartle_df, stats
 
-#save yee radar for each user
-print("User:", list(yee_df.index))
-for player in yee_df.index:
-    save_yee_radar_png(yee_df, player)
 
-#print stats for different users
-print_user_stats(df)
+if __name__ == "__main__":
+    #--chunksize sets the rows read at a time, only one participant is kept in memory
+    parser = argparse.ArgumentParser(description="Perfiles de motivación")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="filas leídas en cada bloque")
+    #--profile saves a cProfile dump of the given stages (see metrics.py)
+    parser.add_argument("--profile", nargs="+", default=[], metavar="ETAPA", help="etapas a perfilar con cProfile")
+    args = parser.parse_args()
+    metrics.profile_stages.update(args.profile)
 
-#save top games and genres graph
-plot_top_games_with_genres(df)
-#save genre distribution grapg
-plot_genre_distribution_histogram(df)
+    run_profiles(chunksize=args.chunksize)
 
-#print confirmation of the script end
-print("Completed")
\ No newline at end of file
+    #print confirmation of the script end
+    print("Completed")
@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_data import write_dataset
+from storage import load_dataset
+from profiles import compute_profiles, compute_user_stats, plot_top_games_with_genres, plot_genre_distribution_histogram
+from exploration import print_unique_tags
+from streaming import stream_eda, stream_profiles
+
+#benchmarks of the analysis stages on synthetic data at several scales
+#times are stored relative to a fixed calibration workload timed on the same run, so a baseline saved on
+#one machine can be checked on another: a stage fails when its relative time is over baseline * (1 + tolerance)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+TOLERANCE = 0.25
+#differences under this many seconds are noise, not regressions
+MIN_DELTA = 0.05
+REPEAT = 3
+
+#name -> (users, games in the catalog)
+SCALES = {
+    "small": (20, 2000),
+    "medium": (100, 5000),
+    "large": (500, 20000)
+}
+
+#plots draw this share of the participants, so they grow with the scale like the other stages
+PLOT_SHARE = 0.05
+
+
+#each stage is (setup, run): setup prepares the input outside the timing and run is measured
+def stage_plots(plot_func):
+    def setup(path, df):
+        stats = compute_user_stats(df)
+        stats = stats.head(max(1, int(len(stats) * PLOT_SHARE)))
+        return stats, tempfile.mkdtemp(prefix="bench_plots_")
+
+    def run(stats, output_dir):
+        plot_func(None, output_dir, workers=1, stats=stats)
+        shutil.rmtree(output_dir)
+    return setup, run
+
+
+STAGES = {
+    "load_dataset": (lambda path, df: (path,), load_dataset),
+    "compute_profiles": (lambda path, df: (df,), compute_profiles),
+    "print_unique_tags": (lambda path, df: (df.copy(),), print_unique_tags),
+    "compute_user_stats": (lambda path, df: (df,), compute_user_stats),
+    "stream_eda": (lambda path, df: (path,), stream_eda),
+    "stream_profiles": (lambda path, df: (path,), stream_profiles),
+    "plot_top_games_with_genres": stage_plots(plot_top_games_with_genres),
+    "plot_genre_distribution_histogram": stage_plots(plot_genre_distribution_histogram)
+}
+
+
+#best time of repeat runs, the output of the stage is discarded
+def measure(setup, run, path, df, repeat):
+    times = []
+    for _ in range(repeat):
+        args = setup(path, df)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run(*args)
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+#pandas and python work of a fixed size (groupby, sort and a dictionary loop), best of repeat runs
+#it is timed before and after the stages and the best time is used, so a slower machine moment counts less
+def calibrate(repeat=REPEAT):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'key': rng.integers(0, 1000, 4000000), 'value': rng.random(4000000)})
+    words = [f"tag {i % 500}" for i in range(800000)]
+
+    def run():
+        df.groupby('key')['value'].sum()
+        np.sort(df['value'].to_numpy())
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+    return measure(lambda path, df: (), run, None, None, repeat)
+
+
+def load_baselines(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+#results are relative times, the machine and its calibration time are kept for reference
+def save_baselines(results, calibration, tolerance, path=BASELINE_PATH):
+    baselines = load_baselines(path)
+    baselines.setdefault("results", {}).update(results)
+    baselines["machine"] = {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count(),
+                            "calibration_s": round(calibration, 4)}
+    baselines["tolerance"] = tolerance
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=1, sort_keys=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de las etapas de análisis con datos sintéticos")
+    parser.add_argument("--scales", nargs="+", default=list(SCALES), choices=list(SCALES))
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="repeticiones de cada etapa (se usa la mejor)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="margen sobre la referencia antes de fallar")
+    parser.add_argument("--save", action="store_true", help="guarda los tiempos como nueva referencia")
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    reference = baselines.get("results", {})
+    calibration = calibrate(args.repeat)
+
+    times = {}
+    regressions = []
+    workdir = tempfile.mkdtemp(prefix="bench_analysis_")
+    print(f"{'Escala':<8} {'Etapa':<36} {'Tiempo (s)':>11}")
+    for scale in args.scales:
+        users, games = SCALES[scale]
+        path = os.path.join(workdir, f"{scale}.csv")
+        write_dataset(path, users, games)
+        df = load_dataset(path)
+        for stage in args.stages:
+            setup, run = STAGES[stage]
+            key = f"{scale}/{stage}"
+            times[key] = measure(setup, run, path, df, args.repeat)
+            print(f"{scale:<8} {stage:<36} {times[key]:>11.4f}")
+    shutil.rmtree(workdir)
+
+    calibration = min(calibration, calibrate(args.repeat))
+    print(f"\nCalibración: {calibration:.4f} s (referencia: {baselines.get('machine', {}).get('calibration_s', '-')} s)")
+    print(f"{'Escala/Etapa':<45} {'Relativo':>9} {'Referencia':>11} {'Cambio':>8}")
+    results = {}
+    for key, seconds in times.items():
+        relative = seconds / calibration
+        results[key] = round(relative, 4)
+        base = reference.get(key)
+        change = f"{relative / base - 1:+.0%}" if base else "-"
+        print(f"{key:<45} {relative:>9.3f} {base if base else '-':>11} {change:>8}")
+        #the noise margin is in seconds of this machine
+        if base and relative > base * (1 + args.tolerance) and seconds - base * calibration > MIN_DELTA:
+            regressions.append(key)
+
+    if args.save:
+        save_baselines(results, calibration, args.tolerance)
+        print(f"Referencia guardada en {BASELINE_PATH}")
+    elif regressions:
+        print("REGRESIÓN en: " + ", ".join(regressions))
+        sys.exit(1)
+    else:
+        print("Sin regresiones")
@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+#end to end benchmark of main.py against the local mock server (mock_server.py)
+#each cohort runs in its own process so peak memory is measured per cohort
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COHORTS = [10, 100, 1000]
+
+
+#runs the whole collection once for n_users and returns its measures
+def run_cohort(n_users, latency, error_rate, throttle_rate, respect_limits):
+    sys.path.insert(0, ROOT)
+    from mock_server import MockServer, build_fixtures
+
+    fixtures = build_fixtures(n_users, os.path.join(ROOT, "data", "steam_data.csv"))
+    server = MockServer(fixtures, latency=latency, error_rate=error_rate, throttle_rate=throttle_rate).start()
+    os.environ["STEAM_API_URL"] = server.url
+    os.environ["STORE_API_URL"] = server.url
+    os.environ["HLTB_SEARCH_URL"] = f"{server.url}/hltb/search"
+
+    #main.py reads the key and the participants from local modules that are not in the repository
+    sys.modules["config"] = types.SimpleNamespace(STEAM_API_KEY="benchmark")
+    sys.modules["participants"] = types.SimpleNamespace(participants=fixtures["participants"])
+
+    import steam_api
+    import hltb
+    #hltb is already imported by mock_server, before the environment variable existed
+    hltb.HLTB_SEARCH_URL = os.environ["HLTB_SEARCH_URL"]
+    #the real limits are for the real api, against the mock they only measure the limiter
+    if not respect_limits:
+        for endpoint in steam_api.limiters:
+            steam_api.limiters[endpoint] = steam_api.TokenBucket(10000.0, 100)
+        hltb.HLTB_RATE = (10000.0, 100)
+
+    workdir = tempfile.mkdtemp(prefix="bench_collect_")
+    os.chdir(workdir)
+    sys.argv = ["main.py"]
+    start = time.perf_counter()
+    runpy.run_path(os.path.join(ROOT, "main.py"), run_name="__main__")
+    wall = time.perf_counter() - start
+    server.shutdown()
+
+    return {
+        "users": n_users,
+        "requests": server.requests,
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(server.requests / wall, 1) if wall else 0.0,
+        #ru_maxrss is in kilobytes on linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "workdir": workdir
+    }
+
+
+#launches a cohort in a subprocess and reads its result from the last line of output
+def measure(n_users, args):
+    command = [sys.executable, os.path.abspath(__file__), "--single", str(n_users),
+               "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+               "--throttle-rate", str(args.throttle_rate)]
+    if args.respect_limits:
+        command.append("--respect-limits")
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la descarga completa contra el servidor local")
+    parser.add_argument("--cohorts", type=int, nargs="+", default=COHORTS, help="número de participantes de cada cohorte")
+    parser.add_argument("--latency", type=float, default=0.0, help="segundos de latencia por petición")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="proporción de respuestas 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="proporción de respuestas 429")
+    parser.add_argument("--respect-limits", action="store_true", help="mantiene los límites de peticiones reales")
+    parser.add_argument("--json", action="store_true", help="imprime los resultados en json")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        #the output of main.py goes to stderr so the last stdout line is the result
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        result = run_cohort(args.single, args.latency, args.error_rate, args.throttle_rate, args.respect_limits)
+        stdout.write(json.dumps(result) + "\n")
+        sys.exit(0)
+
+    results = [measure(n_users, args) for n_users in args.cohorts]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'Usuarios':>9} {'Peticiones':>11} {'Tiempo (s)':>11} {'Pet/s':>9} {'RSS (MB)':>9}")
+        for r in results:
+            print(f"{r['users']:>9} {r['requests']:>11} {r['wall_s']:>11} {r['requests_per_s']:>9} {r['peak_rss_mb']:>9}")
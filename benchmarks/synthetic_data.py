@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import load_dataset
+
+#first appid of the synthetic games, far from the real ones
+BASE_APPID = 10000000
+
+
+#synthetic dataset with the shape of steam_data.csv: n_users participants and a catalog of n_games games
+#tags, types, hltb times, playtimes and achievement ratios are sampled from the recorded dataset
+#so the tag distributions (and the tag combinations of every game) stay realistic
+#ownership follows a zipf popularity, a few games are in most libraries and many in one or two
+def generate_dataset(n_users, n_games, mean_games=150, source=None, seed=0):
+    rng = np.random.default_rng(seed)
+    recorded = load_dataset(source)
+    apps = recorded.drop_duplicates(subset=['appid']).reset_index(drop=True)
+
+    #catalog: every synthetic game copies the tags and hltb data of a recorded game
+    template = rng.integers(0, len(apps), n_games)
+    catalog = apps.iloc[template][['type', 'genres', 'categories', 'release_date', 'developer', 'publisher',
+                                   'hltb_main_story', 'hltb_main_extra', 'hltb_completionist']].reset_index(drop=True)
+    catalog['appid'] = BASE_APPID + np.arange(n_games)
+    catalog['name_x'] = [f"{name} {i}" for i, name in enumerate(apps['name_x'].iloc[template].astype(str))]
+    catalog['has_community_visible_stats'] = apps['has_community_visible_stats'].iloc[template].to_numpy()
+    popularity = 1 / np.arange(1, n_games + 1) ** 0.8
+    popularity /= popularity.sum()
+
+    #libraries: size from an exponential around mean_games, games drawn by popularity
+    sizes = np.clip(rng.exponential(mean_games, n_users).astype(int), 1, n_games)
+    owned = [rng.choice(n_games, size, replace=False, p=popularity) for size in sizes]
+    rows = np.concatenate(owned)
+    df = catalog.iloc[rows].reset_index(drop=True)
+    df['participant_id'] = np.repeat([f"User{i + 1}" for i in range(n_users)], sizes)
+
+    #playtime and achievements from the recorded values
+    df['playtime_forever'] = rng.choice(recorded['playtime_forever'].to_numpy(), len(df))
+    #one decimal like convert_playtime_minutes_to_hours
+    df['playtime_hours'] = (df['playtime_forever'] / 60).round(1)
+    ratios = recorded['achievement_ratio'].to_numpy()
+    df['achievement_ratio'] = rng.choice(ratios, len(df))
+    df['name_y'] = df['name_x']
+    df['name'] = df['name_x'].where(df['hltb_main_story'].notna())
+
+    #same columns and order as the recorded dataset, the ones not generated stay empty
+    return df.reindex(columns=recorded.columns)
+
+
+#writes the dataset as csv (lists as text, like steam_data.csv)
+def write_dataset(path, n_users, n_games, mean_games=150, seed=0):
+    df = generate_dataset(n_users, n_games, mean_games, seed=seed)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    for col in ['genres', 'categories']:
+        df[col] = df[col].apply(lambda tags: str(list(tags)))
+    df.to_csv(path, index=False)
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético con la forma de steam_data.csv")
+    parser.add_argument("--users", type=int, default=100, help="número de participantes")
+    parser.add_argument("--games", type=int, default=5000, help="juegos del catálogo")
+    parser.add_argument("--mean-games", type=int, default=150, help="juegos medios por biblioteca")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="data/synthetic_data.csv")
+    args = parser.parse_args()
+
+    df = write_dataset(args.output, args.users, args.games, args.mean_games, args.seed)
+    print(f"{len(df)} filas guardadas en {args.output}")
@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+#default file for the persistent cache
+CACHE_PATH = "data/cache.sqlite"
+
+#time to live for each kind of response (seconds)
+METADATA_TTL = 30 * 24 * 3600
+HLTB_TTL = 90 * 24 * 3600
+
+#maximum number of stored responses before evicting the least recently used
+MAX_ENTRIES = 100000
+
+#access times of cache hits are written in batches of this size (or with the next set)
+TOUCH_BATCH = 500
+
+#returned by get when the key is not stored or has expired
+MISSING = object()
+
+
+#persistent key/value cache stored in sqlite
+#values are saved as json, with ttl expiry, lru eviction and hit/miss counters
+#hits do not write: their access times are kept in memory and written in batches,
+#and the number of rows is counted once and then kept up to date
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        #the same connection is shared by the collection threads
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_expires ON responses(expires)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        #key -> last access of the hits not written yet
+        self.touched = {}
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+            #not stored or expired
+            if row is None or row[1] < now:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            #last access for lru, written later
+            self.touched[key] = now
+            if len(self.touched) >= TOUCH_BATCH:
+                self._write_touched()
+                self.conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO responses (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            if cursor.rowcount:
+                self.size += 1
+            else:
+                self.conn.execute(
+                    "UPDATE responses SET value = ?, expires = ?, accessed = ? WHERE key = ?",
+                    (json.dumps(value), now + ttl, now, key)
+                )
+            self.touched.pop(key, None)
+            #pending access times go in the same transaction
+            self._write_touched()
+            if self.size > self.max_entries:
+                self._evict()
+            self.conn.commit()
+
+    #writes the access times of the hits since the last write
+    def _write_touched(self):
+        if self.touched:
+            self.conn.executemany("UPDATE responses SET accessed = ? WHERE key = ?",
+                                  [(accessed, key) for key, accessed in self.touched.items()])
+            self.touched = {}
+
+    #writes the pending access times, e.g. at the end of a run
+    def flush(self):
+        with self.lock:
+            self._write_touched()
+            self.conn.commit()
+
+    #over the limit: removes expired entries and then the least recently used ones
+    def _evict(self):
+        self.size -= self.conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),)).rowcount
+        extra = self.size - self.max_entries
+        if extra > 0:
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (extra,)
+            )
+            self.size -= extra
+            self.evictions += extra
+
+    def stats(self):
+        with self.lock:
+            size = self.size
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "size": size
+        }
+
+
+_default_cache = None
+
+
+#shared cache for the whole run, created on first use
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
@@ -0,0 +1,35 @@
+import json
+import os
+import shutil
+
+#folder with the partial results of a collection run
+CHECKPOINT_DIR = "data/checkpoints"
+
+
+def checkpoint_path(stage, name, base_dir=CHECKPOINT_DIR):
+    return os.path.join(base_dir, stage, f"{name}.json")
+
+
+#writes the result of a stage for one participant (or one batch)
+#written to a temporary file first so a crash never leaves half a checkpoint
+def save_checkpoint(stage, name, data, base_dir=CHECKPOINT_DIR):
+    path = checkpoint_path(stage, name, base_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+#returns the saved data, None if the stage was not finished for that name
+def load_checkpoint(stage, name, base_dir=CHECKPOINT_DIR):
+    path = checkpoint_path(stage, name, base_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+#removes all checkpoints (new run or finished run)
+def clear_checkpoints(base_dir=CHECKPOINT_DIR):
+    shutil.rmtree(base_dir, ignore_errors=True)
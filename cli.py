@@ -0,0 +1,201 @@
+import argparse
+
+from metrics import metrics
+
+#single entry point for the collection and the analysis
+#modules are imported inside each command, so the commands that do not draw never load matplotlib
+#  python cli.py collect [--incremental] [--resume]
+#  python cli.py profiles | eda [--approx] | stats [--user X] | plot --user X
+#  python cli.py similar --user X | similar --all --output neighbours.csv
+#  python cli.py segments [--update]
+#  python cli.py db build | db query "SELECT ..."
+
+
+def cmd_collect(args):
+    from main import collect
+    collect(args.incremental, args.resume)
+
+
+def cmd_profiles(args):
+    from analyze_profiles import run_profiles
+    from streaming import CHUNKSIZE
+    run_profiles(args.data, args.chunksize or CHUNKSIZE, plots=not args.no_plots, output_dir=args.output_dir)
+
+
+def cmd_eda(args):
+    from eda import run_eda
+    from streaming import CHUNKSIZE
+    run_eda(args.data, args.chunksize or CHUNKSIZE, args.approx, plots=not args.no_plots, output_dir=args.output_dir,
+            db=args.db)
+
+
+#only the stats of the participants, without tags, profiles or figures
+def cmd_stats(args):
+    from streaming import stream_profiles, NoParticipantsError, CHUNKSIZE
+    from profiles import print_user_stats
+    users = set(args.user) if args.user else None
+    try:
+        _, _, stats, _, _ = stream_profiles(args.data, args.chunksize or CHUNKSIZE, users)
+    except NoParticipantsError as e:
+        raise SystemExit(str(e))
+    print_user_stats(None, stats)
+
+
+#figures of one participant
+#the yee radar compares with the group average, so it needs the profiles of everybody
+def cmd_plot(args):
+    from streaming import stream_profiles, NoParticipantsError, CHUNKSIZE
+    from profiles import save_yee_radars, plot_top_games_with_genres, plot_genre_distribution_histogram
+    kinds = set(args.kind)
+    users = None if "yee" in kinds else {args.user}
+    try:
+        yee_df, _, stats, _, _ = stream_profiles(args.data, args.chunksize or CHUNKSIZE, users)
+    #other errors (e.g. data not grouped by participant) keep their own message
+    except NoParticipantsError:
+        raise SystemExit(f"No hay datos de {args.user}")
+    if args.user not in stats.index:
+        raise SystemExit(f"No hay datos de {args.user}")
+    stats = stats.loc[[args.user]]
+
+    if "yee" in kinds:
+        save_yee_radars(yee_df, args.output_dir, users={args.user})
+    if "games" in kinds:
+        plot_top_games_with_genres(None, args.output_dir, stats=stats)
+    if "genres" in kinds:
+        plot_genre_distribution_histogram(None, args.output_dir, stats=stats)
+
+
+#most similar participants (cosine over the user x game matrix, see similarity.py)
+def cmd_similar(args):
+    from similarity import SimilarityIndex
+    from streaming import CHUNKSIZE
+    if not args.user and not args.all:
+        raise SystemExit("Indica --user o --all")
+    index = SimilarityIndex.from_dataset(args.data, args.weighting, args.profile_weight > 0,
+                                         args.profile_weight, args.chunksize or CHUNKSIZE)
+    if args.all:
+        neighbours = index.top_k(args.k)
+        if args.output:
+            neighbours.to_csv(args.output, index=False)
+            print(f"Vecinos de {len(index.users)} participantes guardados en {args.output}")
+        else:
+            print(neighbours.to_string(index=False))
+    for user in args.user or []:
+        if user not in index.positions:
+            raise SystemExit(f"No hay datos de {user}")
+        print(f"Jugadores parecidos a {user}:")
+        for row in index.similar(user, args.k).itertuples():
+            print(f"- {row.neighbour}: {row.similarity:.3f}")
+
+
+#groups of players with similar yee and bartle profiles (see segmentation.py)
+#--update only adds the new participants to the saved model
+def cmd_segments(args):
+    import os
+    from streaming import stream_motivation_vectors, CHUNKSIZE
+    from segmentation import PlayerSegments, profile_vectors, MODEL_PATH
+    vectors = profile_vectors(*stream_motivation_vectors(args.data, args.chunksize or CHUNKSIZE))
+    if args.update and os.path.exists(MODEL_PATH):
+        segments = PlayerSegments.load(MODEL_PATH)
+        print(f"Participantes nuevos: {segments.update(vectors)}")
+    else:
+        segments = PlayerSegments(args.k).fit(vectors)
+    segments.save(MODEL_PATH)
+
+    assignments = segments.assign(vectors)
+    os.makedirs(args.output_dir, exist_ok=True)
+    assignments.to_csv(f"{args.output_dir}/segments.csv")
+    print(segments.summary(vectors).round(2).to_string())
+    print(f"Grupos guardados en {args.output_dir}/segments.csv")
+
+
+#sqlite database of the dataset (see database.py): build it or run a query on it
+def cmd_db(args):
+    import time
+    from database import build_database, query
+    from streaming import CHUNKSIZE
+    if args.action == "build":
+        start = time.perf_counter()
+        build_database(args.data, args.db, args.chunksize or CHUNKSIZE)
+        print(f"Base de datos creada en {args.db} ({time.perf_counter() - start:.1f} s)")
+        return
+    if not args.sql:
+        raise SystemExit("Indica la consulta SQL")
+    start = time.perf_counter()
+    result = query(args.sql, db_path=args.db)
+    print(result.to_string(index=False))
+    print(f"{len(result)} filas en {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+#float between 0 and 1, for argparse
+def weight(value):
+    value = float(value)
+    if not 0 <= value <= 1:
+        raise argparse.ArgumentTypeError(f"debe estar entre 0 y 1: {value}")
+    return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Datos de Steam y perfiles de motivación")
+    #--profile saves a cProfile dump of the given stages (see metrics.py)
+    parser.add_argument("--profile", nargs="+", default=[], metavar="ETAPA", help="etapas a perfilar con cProfile")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    collect = commands.add_parser("collect", help="descarga los datos de Steam")
+    collect.add_argument("--incremental", action="store_true", help="solo descarga los datos que han cambiado")
+    collect.add_argument("--resume", action="store_true", help="continúa una ejecución interrumpida")
+    collect.set_defaults(func=cmd_collect)
+
+    #options shared by the analysis commands
+    analysis = argparse.ArgumentParser(add_help=False)
+    analysis.add_argument("--data", help="dataset (carpeta de tablas, parquet o csv), por defecto el de data/")
+    analysis.add_argument("--chunksize", type=int, help="filas leídas en cada bloque")
+    analysis.add_argument("--output-dir", default="output", help="carpeta de las figuras")
+
+    profiles = commands.add_parser("profiles", parents=[analysis], help="perfiles de Yee y Bartle, estadísticas y figuras")
+    profiles.add_argument("--no-plots", action="store_true", help="solo imprime los resultados")
+    profiles.set_defaults(func=cmd_profiles)
+
+    eda = commands.add_parser("eda", parents=[analysis], help="análisis exploratorio")
+    #--approx uses sketches (hyperloglog for unique games, kll for percentiles)
+    eda.add_argument("--approx", action="store_true", help="estadísticos aproximados con sketches")
+    eda.add_argument("--no-plots", action="store_true", help="solo imprime los resultados")
+    #--db reads the aggregates from the sqlite database instead of the dataset
+    eda.add_argument("--db", nargs="?", const="data/steam_data.sqlite", help="usa la base de datos sqlite")
+    eda.set_defaults(func=cmd_eda)
+
+    stats = commands.add_parser("stats", parents=[analysis], help="estadísticas de los participantes")
+    stats.add_argument("--user", nargs="+", help="participantes (todos por defecto)")
+    stats.set_defaults(func=cmd_stats)
+
+    plot = commands.add_parser("plot", parents=[analysis], help="figuras de un participante")
+    plot.add_argument("--user", required=True, help="participante")
+    plot.add_argument("--kind", nargs="+", choices=["yee", "games", "genres"], default=["yee", "games", "genres"],
+                      help="figuras a dibujar")
+    plot.set_defaults(func=cmd_plot)
+    similar = commands.add_parser("similar", parents=[analysis], help="jugadores con bibliotecas parecidas")
+    similar.add_argument("--user", nargs="+", help="participantes a consultar")
+    similar.add_argument("--all", action="store_true", help="vecinos de todos los participantes")
+    similar.add_argument("--k", type=int, default=10, help="número de vecinos")
+    similar.add_argument("--weighting", choices=["hours", "log", "binary", "tfidf"], default="log",
+                         help="ponderación de las horas de cada juego")
+    similar.add_argument("--profile-weight", type=weight, default=0.0,
+                         help="peso de los perfiles Yee/Bartle en la similitud (0 a 1)")
+    similar.add_argument("--output", help="csv para los vecinos de --all")
+    similar.set_defaults(func=cmd_similar)
+    segments = commands.add_parser("segments", parents=[analysis], help="grupos de jugadores por perfil")
+    segments.add_argument("--k", type=int, default=4, help="número de grupos")
+    segments.add_argument("--update", action="store_true", help="actualiza el modelo guardado con los participantes nuevos")
+    segments.set_defaults(func=cmd_segments)
+    db = commands.add_parser("db", parents=[analysis], help="base de datos sqlite para consultas")
+    db.add_argument("action", choices=["build", "query"], help="crea la base de datos o ejecuta una consulta")
+    db.add_argument("sql", nargs="?", help="consulta SQL (para query)")
+    db.add_argument("--db", default="data/steam_data.sqlite", help="ruta de la base de datos")
+    db.set_defaults(func=cmd_db)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    metrics.profile_stages.update(args.profile)
+    args.func(args)
@@ -0,0 +1,114 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from metrics import metrics
+
+from steam_api import get_owned_games, get_game_metadata, get_achievement_count, get_player_achievements
+
+from utils import convert_playtime_minutes_to_hours
+
+#number of requests running at the same time
+#the rate limiters in steam_api decide the real speed of each endpoint
+MAX_WORKERS = 8
+
+#columns of the metadata table, one row per unique game
+METADATA_COLUMNS = ["appid", "name", "type", "genres", "categories", "release_date", "developer", "publisher"]
+
+
+#runs func for every item in a bounded thread pool keeping the input order
+def map_concurrent(func, items, max_workers=MAX_WORKERS):
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(metrics.profiled(func), items))
+
+
+#downloads the library of every participant concurrently
+#on_done(user_id, games) is called as soon as each library arrives
+#returns a list of (user_id, steam_id, games)
+def collect_libraries(participants, max_workers=MAX_WORKERS, on_done=None):
+    def fetch(item):
+        user_id, steam_id = item
+        print(f"Descargando juegos para: {user_id}")
+        #retries and backoff are done by the http client and get_owned_games (empty answers),
+        #an empty list is a private or empty profile
+        games = get_owned_games(steam_id)
+        print(f"{user_id}: {len(games)} juegos encontrados") #number of games for user
+        if on_done is not None:
+            on_done(user_id, games)
+        return user_id, steam_id, games
+
+    return map_concurrent(fetch, list(participants.items()), max_workers)
+
+
+#creates dataframe with user id and converts playtime from minutes to hours
+def library_to_df(user_id, games):
+    df = pd.DataFrame(games)
+    df['participant_id'] = user_id
+    return convert_playtime_minutes_to_hours(df)
+
+
+#gets achievement ratio for every game of a user
+#games without visible stats or without achievements in their schema are skipped,
+#and if the profile is private no more calls are made for that user
+#if there is no value, returns 0.0
+def collect_achievements(steam_id, df, max_workers=MAX_WORKERS):
+    ratios = pd.Series(0.0, index=df.index)
+
+    #only games with community stats can have achievements
+    if 'has_community_visible_stats' in df.columns:
+        candidates = df[df['has_community_visible_stats'] == True]
+    else:
+        candidates = df
+    appids = list(candidates['appid'].unique())
+    if not appids:
+        return ratios.tolist()
+
+    #schema counts are cached by app and shared between users
+    counts = map_concurrent(get_achievement_count, appids, max_workers)
+    #unknown counts (None) fall back to asking the user
+    appids = [appid for appid, count in zip(appids, counts) if count != 0]
+    if not appids:
+        return ratios.tolist()
+
+    #first call alone, to detect private profiles before launching the rest
+    status, ratio = get_player_achievements(steam_id, appids[0])
+    if status == "private":
+        print(f"Perfil privado, se omiten logros para {steam_id}")
+        return ratios.tolist()
+    results = {appids[0]: ratio}
+
+    private = threading.Event()
+
+    def fetch(appid):
+        if private.is_set():
+            return None
+        status, ratio = get_player_achievements(steam_id, appid)
+        if status == "private":
+            private.set()
+        return ratio
+
+    results.update(zip(appids[1:], map_concurrent(fetch, appids[1:], max_workers)))
+    found = df['appid'].map(results)
+    return found.where(found.notna(), ratios).tolist()
+
+
+#creates the metadata dictionary of a game
+def metadata_row(appid, meta):
+    return {
+        "appid": appid,
+        "name": meta.get("name", ""),
+        "type": meta.get("type", ""),
+        "genres": ", ".join([g["description"] for g in meta.get("genres", [])]) if "genres" in meta else "",
+        "categories": ", ".join([c["description"] for c in meta.get("categories", [])]) if "categories" in meta else "",
+        "release_date": meta.get("release_date", {}).get("date", ""),
+        "developer": ", ".join(meta.get("developers", [])) if "developers" in meta else "",
+        "publisher": ", ".join(meta.get("publishers", [])) if "publishers" in meta else ""
+    }
+
+
+#gets metadata of the given games concurrently, skipping games without data
+def collect_metadata(appids, max_workers=MAX_WORKERS):
+    appids = list(appids)
+    metas = map_concurrent(get_game_metadata, appids, max_workers)
+    return [metadata_row(appid, meta) for appid, meta in zip(appids, metas) if meta]
@@ -0,0 +1,238 @@
+import os
+import sqlite3
+from collections import Counter
+
+import pandas as pd
+
+from streaming import iter_chunks, EdaAggregates, RunningMoments, ValueHistogram, Reservoir, CHUNKSIZE, SAMPLE_SIZE
+
+#sqlite database with the collected data split in tables, for eda.py and ad-hoc queries
+DB_PATH = "data/steam_data.sqlite"
+
+#one row per participant, per owned game (a participant may repeat a game, like the dataset),
+#per game with store metadata, per tag of a game and per game found in howlongtobeat
+SCHEMA = """
+CREATE TABLE participants (
+    participant_id TEXT PRIMARY KEY,
+    games INTEGER,
+    playtime_hours REAL
+);
+CREATE TABLE ownership (
+    participant_id TEXT NOT NULL,
+    appid INTEGER NOT NULL,
+    name TEXT,
+    playtime_forever INTEGER,
+    playtime_hours REAL,
+    achievement_ratio REAL,
+    has_community_visible_stats INTEGER,
+    playtime_2weeks REAL,
+    rtime_last_played REAL
+);
+CREATE TABLE apps (
+    appid INTEGER PRIMARY KEY,
+    name TEXT,
+    type TEXT,
+    release_date TEXT,
+    developer TEXT,
+    publisher TEXT
+);
+CREATE TABLE app_genres (
+    appid INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    genre TEXT NOT NULL
+);
+CREATE TABLE app_categories (
+    appid INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE TABLE hltb (
+    appid INTEGER PRIMARY KEY,
+    name TEXT,
+    main_story REAL,
+    main_extra REAL,
+    completionist REAL
+);
+"""
+
+#created after loading the rows, so the inserts do not update them one by one
+INDEXES = """
+CREATE INDEX ownership_participant ON ownership (participant_id);
+CREATE INDEX ownership_appid ON ownership (appid);
+CREATE INDEX app_genres_appid ON app_genres (appid);
+CREATE INDEX app_genres_genre ON app_genres (genre);
+CREATE INDEX app_categories_appid ON app_categories (appid);
+CREATE INDEX app_categories_category ON app_categories (category);
+"""
+
+OWNERSHIP_COLUMNS = ['participant_id', 'appid', 'name_x', 'playtime_forever', 'playtime_hours', 'achievement_ratio',
+                     'has_community_visible_stats', 'playtime_2weeks', 'rtime_last_played']
+APP_COLUMNS = ['appid', 'name_y', 'type', 'release_date', 'developer', 'publisher']
+HLTB_COLUMNS = ['appid', 'name', 'hltb_main_story', 'hltb_main_extra', 'hltb_completionist']
+
+
+#rows of the given columns as tuples, missing values as NULL (columns not in the dataset too)
+def sql_rows(df, columns):
+    df = df.reindex(columns=columns)
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+#True/False (or their text) as 1/0
+def flag(value):
+    if value in (True, 'True', 'true', 1):
+        return 1
+    if value in (False, 'False', 'false', 0):
+        return 0
+    return None
+
+
+#builds the database from the dataset (tables, parquet or csv), reading it in chunks
+#the file is written next to db_path and replaces it at the end
+def build_database(path=None, db_path=DB_PATH, chunksize=CHUNKSIZE):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+
+    seen = set()
+    for chunk in iter_chunks(path, chunksize):
+        chunk = chunk.assign(participant_id=chunk['participant_id'].astype(str))
+        if 'has_community_visible_stats' in chunk.columns:
+            chunk['has_community_visible_stats'] = chunk['has_community_visible_stats'].map(flag)
+        conn.executemany("INSERT INTO ownership VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", sql_rows(chunk, OWNERSHIP_COLUMNS))
+
+        #metadata, tags and hltb of the games not seen in the previous chunks (they are the same in every row)
+        apps = chunk.drop_duplicates(subset=['appid'])
+        apps = apps[~apps['appid'].isin(seen)]
+        seen.update(apps['appid'].tolist())
+        conn.executemany("INSERT INTO apps VALUES (?, ?, ?, ?, ?, ?)", sql_rows(apps, APP_COLUMNS))
+        for column, table in [('genres', 'app_genres'), ('categories', 'app_categories')]:
+            if column in apps.columns:
+                conn.executemany(f"INSERT INTO {table} VALUES (?, ?, ?)",
+                                 [(int(appid), i, tag) for appid, tags in zip(apps['appid'], apps[column])
+                                  for i, tag in enumerate(tags)])
+        if 'hltb_main_story' in apps.columns:
+            hltb = apps[apps[['hltb_main_story', 'hltb_main_extra', 'hltb_completionist']].notna().any(axis=1)]
+            conn.executemany("INSERT INTO hltb VALUES (?, ?, ?, ?, ?)", sql_rows(hltb, HLTB_COLUMNS))
+
+    conn.execute("""
+        INSERT INTO participants
+        SELECT participant_id, COUNT(*), TOTAL(playtime_hours) FROM ownership GROUP BY participant_id
+    """)
+    conn.executescript(INDEXES)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+#read only connection to the database
+def connect(db_path=DB_PATH):
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"No existe {db_path}, créala con build_database (python cli.py db build)")
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+#result of a query as a dataframe
+def query(sql, params=(), db_path=DB_PATH):
+    conn = connect(db_path)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+#the aggregates of eda.py as queries, with the same attributes as streaming.EdaAggregates
+#only small results (one row per tag, per game or per distinct playtime) are loaded into python
+class EdaQueries:
+    top = staticmethod(EdaAggregates.top)
+
+    def __init__(self, conn, sample_size=SAMPLE_SIZE):
+        self.conn = conn
+        self.sample_size = sample_size
+        self.rows = self.scalar("SELECT COUNT(*) FROM ownership")
+        self.participants = [row[0] for row in conn.execute("SELECT participant_id FROM participants")]
+        #hours by genre, category and game
+        self.genre_hours = self.counter("""
+            SELECT g.genre, TOTAL(o.playtime_hours) FROM ownership o JOIN app_genres g ON g.appid = o.appid
+            GROUP BY g.genre
+        """)
+        self.category_hours = self.counter("""
+            SELECT c.category, TOTAL(o.playtime_hours) FROM ownership o JOIN app_categories c ON c.appid = o.appid
+            GROUP BY c.category
+        """)
+        self.game_hours = self.counter("""
+            SELECT name, TOTAL(playtime_hours) FROM ownership WHERE name IS NOT NULL GROUP BY name
+        """)
+        #playtime of all games and of played games
+        self.playtime = self.moments("playtime_hours IS NOT NULL")
+        self.played = self.moments("playtime_hours > 0")
+        self.played_values = ValueHistogram()
+        self.played_values.counts = Counter(dict(conn.execute("""
+            SELECT playtime_hours, COUNT(*) FROM ownership WHERE playtime_hours > 0 GROUP BY playtime_hours
+        """)))
+        self.zero_hours = self.scalar("SELECT COUNT(*) FROM ownership WHERE playtime_hours = 0")
+        #games without genre or category
+        self.no_genre = self.scalar("""
+            SELECT COUNT(*) FROM ownership o WHERE NOT EXISTS (SELECT 1 FROM app_genres g WHERE g.appid = o.appid)
+        """)
+        self.no_category = self.scalar("""
+            SELECT COUNT(*) FROM ownership o
+            WHERE NOT EXISTS (SELECT 1 FROM app_categories c WHERE c.appid = o.appid)
+        """)
+
+    def scalar(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def counter(self, sql):
+        return Counter(dict(self.conn.execute(sql)))
+
+    #count, mean and squared differences of the playtime of the rows matching where
+    def moments(self, where):
+        moments = RunningMoments()
+        count, mean = self.conn.execute(f"SELECT COUNT(playtime_hours), AVG(playtime_hours) FROM ownership WHERE {where}").fetchone()
+        if count:
+            moments.count = count
+            moments.mean = mean
+            moments.m2 = self.scalar(f"SELECT TOTAL((playtime_hours - ?) * (playtime_hours - ?)) FROM ownership WHERE {where}",
+                                     (mean, mean))
+        return moments
+
+    #number of unique games, of unique played games and of unique games never played
+    def unique_games(self):
+        return self.scalar("SELECT COUNT(DISTINCT appid) FROM ownership")
+
+    def unique_played_games(self):
+        return self.scalar("SELECT COUNT(DISTINCT appid) FROM ownership WHERE playtime_hours > 0")
+
+    def unique_unplayed_games(self):
+        return self.scalar("""
+            SELECT COUNT(DISTINCT appid) FROM ownership
+            WHERE appid NOT IN (SELECT appid FROM ownership WHERE playtime_hours > 0)
+        """)
+
+    def quantile(self, q):
+        return self.played_values.quantile(q)
+
+    #(participant_id, hltb_main_story, playtime_hours) of the games found in hltb, sampled like the streaming pass
+    def hltb_sample(self):
+        reservoir = Reservoir(self.sample_size)
+        cursor = self.conn.execute("""
+            SELECT o.participant_id, h.main_story, o.playtime_hours FROM ownership o JOIN hltb h ON h.appid = o.appid
+            WHERE h.main_story > 0 ORDER BY o.rowid
+        """)
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            reservoir.update(rows)
+        return pd.DataFrame(reservoir.items, columns=['participant_id', 'hltb_main_story', 'playtime_hours']) \
+            .sort_values(by='participant_id', kind='stable')
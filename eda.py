@@ -1,191 +1,189 @@
-from utils import normalize_list_column
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import ast
-import numpy as np
-
-
-#upload data from csv and sort by participant id
-df = pd.read_csv("data/steam_data.csv")
-df = df.sort_values(by='participant_id')
-
-#convert genres and categories columns to lists
-df['genres'] = df['genres'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else [])
-df['categories'] = df['categories'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else [])
-
-# ------------------- TOP GENRES -------------------
-#creates a row for every game genre
-exploded_genres = df.explode('genres')
-#group by genre and sort ny hours played, getting the TOP 10
-top_genres = exploded_genres.groupby('genres')['playtime_hours'].sum().sort_values(ascending=False).head(10)
-
-plt.figure(figsize=(10, 6))
-sns.barplot(x=top_genres.values, y=top_genres.index, palette='Blues_r')
-plt.title('Top 10 géneros más jugados por horas')
-plt.xlabel('Horas jugadas')
-plt.ylabel('Género')
-plt.tight_layout()
-#save as png
-plt.savefig("output/top_generos_grupo.png")
-plt.close()
-
-# ------------------- TOP CATEGORIES -------------------
-#creates a row for every game category
-exploded_categories = df.explode('categories')
-#group by genre and sort ny hours played, getting the TOP 10
-top_categories = exploded_categories.groupby('categories')['playtime_hours'].sum().sort_values(ascending=False).head(10)
-
-plt.figure(figsize=(10, 6))
-sns.barplot(x=top_categories.values, y=top_categories.index, palette='Greens_r')
-plt.title('Top 10 categorías más jugadas por horas')
-plt.xlabel('Horas jugadas')
-plt.ylabel('Categoría')
-plt.tight_layout()
-#save as png
-plt.savefig("output/top_categorias_grupo.png")
-plt.close()
-
-# ------------------- COMPARATIVE HLTB ------------------- (HowLongToBeat)
-#filter games with data from hltb with more than 0 hours
-df_hltb = df[(df['hltb_main_story'].notna()) & (df['hltb_main_story'] > 0)]
-
-plt.figure(figsize=(8, 6))
-sns.scatterplot(
-    data=df_hltb,
-    x='hltb_main_story',
-    y='playtime_hours',
-    hue='participant_id',
-    alpha=0.7
-)
-plt.plot([0, 100], [0, 100], linestyle='--', color='grey')
-plt.title('Horas jugadas vs estimación HLTB')
-plt.xlabel('HLTB: Historia principal (horas)')
-plt.ylabel('Horas jugadas reales')
-plt.xlim(0, df_hltb['hltb_main_story'].max() + 5)
-plt.ylim(0, df_hltb['playtime_hours'].max() + 5)
-plt.savefig("output/plot_hltb.png")
-plt.close()
-
-
-
-# ------------------- COMPARATIVE HLTB (FILTERED) ------------------- #
-#filter to games between HLTB in range [+0, 100] and playtime hours  in range [+0, 200]
-df_hltb_filtered = df[
-    (df['hltb_main_story'].notna()) &
-    (df['hltb_main_story'] > 0) &
-    (df['hltb_main_story'] <= 100) &
-    (df['playtime_hours'] > 0) &  
-    (df['playtime_hours'] <= 200)
-]
-
-plt.figure(figsize=(8, 6))
-sns.scatterplot(
-    data=df_hltb_filtered,
-    x='hltb_main_story',
-    y='playtime_hours',
-    hue='participant_id',
-    alpha=0.7
-)
-plt.plot([0, 100], [0, 100], linestyle='--', color='grey')
-plt.title('Horas jugadas vs estimación HLTB (filtrado)')
-plt.xlabel('HLTB: Historia principal (horas)')
-plt.ylabel('Horas jugadas reales')
-#axis limitations
-plt.xlim(0, 105)
-plt.ylim(0, 205)
-plt.tight_layout()
-plt.savefig("output/plot_hltb_filtered.png")
-plt.close()
+import argparse
 
+import numpy as np
 
+from streaming import stream_eda, CHUNKSIZE
 
+from metrics import metrics, report_path
 
-# ------------------- GENERAL INSIGHT -------------------
-print("\nResumen exploratorio:")
-print("- Número de juegos totales:", len(df)) #total number of games
-print("- Número de juegos únicos:", df['appid'].nunique()) #total number of unique games
-print("- Número de juegos compartidos:", len(df)-df['appid'].nunique()) #total number of repeated games
-print("- Número de participantes:", df['participant_id'].nunique()) #number of participants
-print("- Género más jugado:", top_genres.idxmax()) #most played genre
-print("- Categoría más jugada:", top_categories.idxmax()) #most played category
-print("- Tiempo medio por juego:", round(df['playtime_hours'].mean(), 2), "horas") #average game time
+#matplotlib and seaborn are imported inside the plotting functions, only when figures are drawn
 
-mean_played = df[df['playtime_hours'] > 0]['playtime_hours'].mean() #calculate mean
-print("- Tiempo medio por juego (solo si jugado):", round(mean_played, 2), "horas") #average mean time for played games
 
-num_juegos_0_horas = (df['playtime_hours'] == 0).sum() #calculate 0 hours played games
-print("- Juegos con 0 horas jugadas:", num_juegos_0_horas) #games with 0 hours
+#bar plot of a TOP 10 of hours (by genre, category or game)
+def plot_top_hours(top, palette, title, xlabel, ylabel, save_path):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-num_juegos_jugados = df[df['playtime_hours'] > 0]['appid'].nunique() #calculate number of unique played games for more than 0 hours
-print("- Número de juegos únicos con más de 0 horas:", num_juegos_jugados) #unique games with +0 hours
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x=top.values, y=top.index, palette=palette)
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.tight_layout()
+    #save as png
+    plt.savefig(save_path)
+    plt.close()
 
 
-juegos_total = df['appid'].unique() #total unique games
-juegos_jugados = df[df['playtime_hours'] > 0]['appid'].unique() #played unique games
-juegos_no_jugados = set(juegos_total) - set(juegos_jugados) #unique not played games
+# ------------------- COMPARATIVE HLTB ------------------- (HowLongToBeat)
+#played hours against the hltb estimation, for all the games and filtered
+def plot_hltb(df_hltb, output_dir="output"):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(8, 6))
+    sns.scatterplot(
+        data=df_hltb,
+        x='hltb_main_story',
+        y='playtime_hours',
+        hue='participant_id',
+        alpha=0.7
+    )
+    plt.plot([0, 100], [0, 100], linestyle='--', color='grey')
+    plt.title('Horas jugadas vs estimación HLTB')
+    plt.xlabel('HLTB: Historia principal (horas)')
+    plt.ylabel('Horas jugadas reales')
+    plt.xlim(0, df_hltb['hltb_main_story'].max() + 5)
+    plt.ylim(0, df_hltb['playtime_hours'].max() + 5)
+    plt.savefig(f"{output_dir}/plot_hltb.png")
+    plt.close()
+
+    # ------------------- COMPARATIVE HLTB (FILTERED) ------------------- #
+    #filter to games between HLTB in range [+0, 100] and playtime hours  in range [+0, 200]
+    df_hltb_filtered = df_hltb[
+        (df_hltb['hltb_main_story'] <= 100) &
+        (df_hltb['playtime_hours'] > 0) &
+        (df_hltb['playtime_hours'] <= 200)
+    ]
+
+    plt.figure(figsize=(8, 6))
+    sns.scatterplot(
+        data=df_hltb_filtered,
+        x='hltb_main_story',
+        y='playtime_hours',
+        hue='participant_id',
+        alpha=0.7
+    )
+    plt.plot([0, 100], [0, 100], linestyle='--', color='grey')
+    plt.title('Horas jugadas vs estimación HLTB (filtrado)')
+    plt.xlabel('HLTB: Historia principal (horas)')
+    plt.ylabel('Horas jugadas reales')
+    #axis limitations
+    plt.xlim(0, 105)
+    plt.ylim(0, 205)
+    plt.tight_layout()
+    plt.savefig(f"{output_dir}/plot_hltb_filtered.png")
+    plt.close()
 
-print("- Número de juegos únicos con 0 horas:", len(juegos_no_jugados)) #unique games with 0 hours
 
+# ------------------- GENERAL INSIGHT -------------------
+def print_summary(agg, top_genres, top_categories):
+    print("\nResumen exploratorio:")
+    print("- Número de juegos totales:", agg.rows) #total number of games
+    print("- Número de juegos únicos:", agg.unique_games()) #total number of unique games
+    print("- Número de juegos compartidos:", agg.rows-agg.unique_games()) #total number of repeated games
+    print("- Número de participantes:", len(agg.participants)) #number of participants
+    print("- Género más jugado:", top_genres.idxmax()) #most played genre
+    print("- Categoría más jugada:", top_categories.idxmax()) #most played category
+    print("- Tiempo medio por juego:", round(agg.playtime.mean, 2), "horas") #average game time
 
-# ------------------- Top 10 games -------------------
+    mean_played = agg.played.mean #calculate mean
+    print("- Tiempo medio por juego (solo si jugado):", round(mean_played, 2), "horas") #average mean time for played games
 
+    num_juegos_0_horas = agg.zero_hours #calculate 0 hours played games
+    print("- Juegos con 0 horas jugadas:", num_juegos_0_horas) #games with 0 hours
 
-top_games_group = (
-    df.groupby('name_x')['playtime_hours'] #group by game name
-    .sum() #sum total hours
-    .sort_values(ascending=False)
-    .head(10) #get TOP 10
-)
+    num_juegos_jugados = agg.unique_played_games() #calculate number of unique played games for more than 0 hours
+    print("- Número de juegos únicos con más de 0 horas:", num_juegos_jugados) #unique games with +0 hours
 
-plt.figure(figsize=(10, 6))
-sns.barplot(x=top_games_group.values, y=top_games_group.index, palette="Oranges_d")
-plt.title("Top 10 juegos más jugados por el grupo")
-plt.xlabel("Horas totales jugadas")
-plt.ylabel("Juego")
-plt.tight_layout()
-plt.savefig("output/top_juegos_grupo.png")
-plt.close()
+    juegos_no_jugados = agg.unique_unplayed_games() #unique not played games
+    print("- Número de juegos únicos con 0 horas:", juegos_no_jugados) #unique games with 0 hours
 
 
 # ------------------- EDA -------------------
-#filter only played games
-played = df[df['playtime_hours'] > 0]['playtime_hours']
-
-#dispersion statistics
-std = played.std()
-mean = played.mean()
-cv = std / mean if mean != 0 else np.nan  #coefficient of variation
-percentiles = played.quantile([0.25, 0.5, 0.75, 0.9])
-iqr = percentiles[0.75] - percentiles[0.25] #interquartile range
-
-
-#print statistics
-print("----------------------Estadísticos--------------------------")
-print(f"- Desviación estándar: {std:.2f} horas")
-print(f"- Coeficiente de variación (CV): {cv:.2f}")
-print(f"- Percentil 25 (Q1): {percentiles[0.25]:.2f} horas")
-print(f"- Percentil 50 (Mediana): {percentiles[0.5]:.2f} horas")
-print(f"- Percentil 75 (Q3): {percentiles[0.75]:.2f} horas")
-print(f"- Percentil 90: {percentiles[0.9]:.2f} horas")
-print(f"- Rango intercuartílico (IQR): {iqr:.2f} horas")
-
-
-
-
-
-# ------------------- NO GENRE/CATEGORY -------------------
-sin_genero = 0 #no genre
-sin_categoria = 0 #no category
-
-for i, row in df.iterrows():
-    #count empty genre
-    if not row['genres'] or row['genres'] == [] or row['genres'] == "['']":
-        sin_genero += 1
-
-    #count empty category
-    if not row['categories'] or row['categories'] == [] or row['categories'] == "['']":
-        sin_categoria += 1
-
-print(f"Juegos sin género: {sin_genero}") #nbo genre
-print(f"Juegos sin categoría: {sin_categoria}") #no category
\ No newline at end of file
+#only played games
+def print_statistics(agg):
+    #dispersion statistics
+    std = agg.played.std()
+    mean = agg.played.mean
+    cv = std / mean if mean != 0 else np.nan  #coefficient of variation
+    percentiles = {q: agg.quantile(q) for q in [0.25, 0.5, 0.75, 0.9]}
+    iqr = percentiles[0.75] - percentiles[0.25] #interquartile range
+
+    #print statistics
+    print("----------------------Estadísticos--------------------------")
+    print(f"- Desviación estándar: {std:.2f} horas")
+    print(f"- Coeficiente de variación (CV): {cv:.2f}")
+    print(f"- Percentil 25 (Q1): {percentiles[0.25]:.2f} horas")
+    print(f"- Percentil 50 (Mediana): {percentiles[0.5]:.2f} horas")
+    print(f"- Percentil 75 (Q3): {percentiles[0.75]:.2f} horas")
+    print(f"- Percentil 90: {percentiles[0.9]:.2f} horas")
+    print(f"- Rango intercuartílico (IQR): {iqr:.2f} horas")
+
+    # ------------------- NO GENRE/CATEGORY -------------------
+    sin_genero = agg.no_genre #no genre
+    sin_categoria = agg.no_category #no category
+
+    print(f"Juegos sin género: {sin_genero}") #nbo genre
+    print(f"Juegos sin categoría: {sin_categoria}") #no category
+
+
+#whole exploratory analysis, plots=False only prints the results
+#db is the path of the sqlite database (database.py), whose queries replace reading the dataset
+#returns the aggregates
+def run_eda(path=None, chunksize=CHUNKSIZE, approximate=False, plots=True, output_dir="output", db=None):
+    metrics.mark("read")
+    if db is not None:
+        from database import EdaQueries, connect
+        agg = EdaQueries(connect(db))
+    else:
+        #reads the data in chunks and keeps running aggregates (hours by tag, unique games, playtime histogram)
+        agg = stream_eda(path, chunksize=chunksize, approximate=approximate)
+
+    #hours played by genre and by category, getting the TOP 10
+    top_genres = agg.top(agg.genre_hours, 10)
+    top_categories = agg.top(agg.category_hours, 10)
+
+    if plots:
+        metrics.mark("top_genres")
+        plot_top_hours(top_genres, 'Blues_r', 'Top 10 géneros más jugados por horas',
+                       'Horas jugadas', 'Género', f"{output_dir}/top_generos_grupo.png")
+        metrics.mark("top_categories")
+        plot_top_hours(top_categories, 'Greens_r', 'Top 10 categorías más jugadas por horas',
+                       'Horas jugadas', 'Categoría', f"{output_dir}/top_categorias_grupo.png")
+        #games with data from hltb with more than 0 hours (uniform sample for very large datasets)
+        metrics.mark("hltb")
+        plot_hltb(agg.hltb_sample(), output_dir)
+
+    metrics.mark("summary")
+    print_summary(agg, top_genres, top_categories)
+
+    # ------------------- Top 10 games -------------------
+    if plots:
+        metrics.mark("top_games")
+        top_games_group = agg.top(agg.game_hours, 10) #total hours by game name, get TOP 10
+        plot_top_hours(top_games_group, "Oranges_d", "Top 10 juegos más jugados por el grupo",
+                       "Horas totales jugadas", "Juego", f"{output_dir}/top_juegos_grupo.png")
+
+    metrics.mark("statistics")
+    print_statistics(agg)
+
+    #run report with the time of every section
+    metrics.save(report_path("eda"))
+    return agg
+
+
+if __name__ == "__main__":
+    #--chunksize sets the rows read at a time, memory does not grow with the dataset
+    parser = argparse.ArgumentParser(description="Análisis exploratorio")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="filas leídas en cada bloque")
+    #--approx uses sketches (hyperloglog for unique games, kll for percentiles)
+    parser.add_argument("--approx", action="store_true", help="estadísticos aproximados con sketches")
+    #--db reads the aggregates from the sqlite database (see database.py)
+    parser.add_argument("--db", nargs="?", const="data/steam_data.sqlite", help="usa la base de datos sqlite")
+    #--profile saves a cProfile dump of the given stages (see metrics.py)
+    parser.add_argument("--profile", nargs="+", default=[], metavar="ETAPA", help="etapas a perfilar con cProfile")
+    args = parser.parse_args()
+    metrics.profile_stages.update(args.profile)
+
+    run_eda(chunksize=args.chunksize, approximate=args.approx, db=args.db)
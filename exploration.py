@@ -1,15 +1,10 @@
-import ast 
-
 import pandas as pd
 
+from storage import to_list
+
 def to_list_if_str(x):
-#converts strings to lists
-    if isinstance(x, str):
-        try:
-            return ast.literal_eval(x)
-        except:
-            return []
-    return x
+#converts strings to lists (lists from load_dataset are returned as they are)
+    return to_list(x)
 
 
 def print_unique_tags(df):
@@ -26,6 +21,11 @@ def print_unique_tags(df):
     for categories in df['categories']:
         all_categories.update(categories)
 
+    print_tag_lists(all_genres, all_categories)
+
+
+#prints the sorted lists of genres and categories
+def print_tag_lists(all_genres, all_categories):
     #print genre list
     print("Géneros:")
     for genre in sorted(all_genres):
@@ -0,0 +1,157 @@
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from cache import get_default_cache, MISSING, HLTB_TTL
+
+from rate_limiter import TokenBucket
+
+from metrics import metrics
+
+#searches running at the same time and requests per second allowed by howlongtobeat
+HLTB_WORKERS = 4
+HLTB_RATE = (1.0, 2)
+
+#hours columns of a result (storage.HLTB_COLUMNS also keeps the matched name)
+HLTB_TIME_COLUMNS = ["hltb_main_story", "hltb_main_extra", "hltb_completionist"]
+
+#if set, titles are searched in this url (a local server, see mock_server.py) instead of howlongtobeat
+HLTB_SEARCH_URL = os.environ.get("HLTB_SEARCH_URL")
+
+#symbols and edition suffixes that are not part of the game title
+#edition words only count at the end of the title ("Ultimate Chicken Horse" or "Persona 5 Royal" keep them)
+#adjectives like gold or digital need "edition"/"cut" after them, goty and remastered do not
+TRADEMARKS = re.compile(r"[™®©℗]")
+EDITION_SUFFIX = (
+    r"(?:(?:game of the year|goty|definitive|deluxe|complete|ultimate|gold|premium|special|enhanced|"
+    r"anniversary|collector'?s|digital|standard|legendary|royal|director'?s)\s+(?:edition|cut)"
+    r"|game of the year|goty|remastered|remaster|edition)"
+)
+EDITIONS = re.compile(rf"(?:[\s:\-–(]+{EDITION_SUFFIX}\)?)+\s*$")
+
+
+#title used to search howlongtobeat
+#casefolded, without trademarks, accents, trailing edition names or punctuation
+def normalize_title(name):
+    title = unicodedata.normalize("NFKD", TRADEMARKS.sub("", str(name)).casefold())
+    title = "".join(c for c in title if not unicodedata.combining(c))
+    title = EDITIONS.sub(" ", title)
+    title = re.sub(r"[^\w]+", " ", title)
+    #an edition name alone (e.g. "Deluxe") keeps its original text
+    return " ".join(title.split()) or " ".join(str(name).casefold().split())
+
+
+#row with empty times, for games not found
+def empty_result(name):
+    return {"name": name, **{col: None for col in HLTB_TIME_COLUMNS}}
+
+
+#searches a title in howlongtobeat and returns the best match
+def search_hltb(title):
+    if HLTB_SEARCH_URL:
+        return search_hltb_url(title)
+    from howlongtobeatpy import HowLongToBeat
+
+    results = HowLongToBeat().search(title)
+    if not results:
+        return None
+    #uses matching because of some names and editions coincidence
+    best_match = max(results, key=lambda x: x.similarity)
+    return {
+        "name": best_match.game_name,
+        "hltb_main_story": best_match.main_story,
+        "hltb_main_extra": best_match.main_extra,
+        "hltb_completionist": best_match.completionist
+    }
+
+
+#same search against HLTB_SEARCH_URL, which answers a json list of results
+def search_hltb_url(title):
+    import requests
+
+    response = requests.get(HLTB_SEARCH_URL, params={"title": title}, timeout=30)
+    response.raise_for_status()
+    results = response.json()
+    if not results:
+        return None
+    best_match = max(results, key=lambda x: x["similarity"])
+    return {
+        "name": best_match["game_name"],
+        "hltb_main_story": best_match["main_story"],
+        "hltb_main_extra": best_match["main_extra"],
+        "hltb_completionist": best_match["completionist"]
+    }
+
+
+#howlongtobeat enrichment with a persisted appid -> result mapping and a game name index
+#known games resolve from the cache and only unseen titles are searched, concurrently and rate limited
+#names with the same normalized title are searched and cached once, so "X" and "X - Deluxe Edition" share the result across runs
+#search is the function used for a title (search_hltb by default)
+class HLTBEngine:
+    def __init__(self, cache=None, workers=HLTB_WORKERS, search=search_hltb):
+        self.cache = cache or get_default_cache()
+        self.workers = workers
+        self.search = search
+        self.limiter = TokenBucket(*HLTB_RATE)
+
+    def _search(self, title):
+        self.limiter.acquire()
+        start = time.perf_counter()
+        try:
+            return title, self.search(title), True
+        except Exception as e:
+            metrics.count("hltb.errors")
+            print(f"Error con '{title}': {e}")
+            return title, None, False
+        finally:
+            metrics.observe("hltb", time.perf_counter() - start)
+
+    #results for a dictionary appid -> game name
+    def lookup(self, names):
+        results = {}
+        pending = {}
+        for appid, name in names.items():
+            #games already resolved by appid
+            cached = self.cache.get(f"hltb_app:{appid}")
+            if cached is not MISSING:
+                metrics.count("hltb.appid_hits")
+                results[appid] = cached
+                continue
+            #games with a known title (same game under another appid or edition)
+            title = normalize_title(name)
+            cached = self.cache.get(f"hltb:{title}")
+            if cached is not MISSING:
+                metrics.count("hltb.title_hits")
+                results[appid] = cached
+                self.cache.set(f"hltb_app:{appid}", cached, HLTB_TTL)
+                continue
+            pending.setdefault(title, []).append(appid)
+
+        if pending:
+            metrics.count("hltb.searches", len(pending))
+            print(f"Buscando {len(pending)} títulos en HowLongToBeat")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for title, found, ok in executor.map(metrics.profiled(self._search), list(pending)):
+                    #errors are not cached so they are searched again next run
+                    if ok:
+                        self.cache.set(f"hltb:{title}", found or empty_result(names[pending[title][0]]), HLTB_TTL)
+                    for appid in pending[title]:
+                        result = found or empty_result(names[appid])
+                        results[appid] = result
+                        if ok:
+                            self.cache.set(f"hltb_app:{appid}", result, HLTB_TTL)
+        return results
+
+    #adds the hltb columns to the dataframe, joined by appid
+    def enrich(self, df, game_name_col='name'):
+        games = df[['appid', game_name_col]].dropna(subset=[game_name_col]).drop_duplicates(subset=['appid'])
+        results = self.lookup(dict(zip(games['appid'], games[game_name_col])))
+        hltb_df = pd.DataFrame(
+            [{"appid": appid, **result} for appid, result in results.items()],
+            columns=["appid", "name"] + HLTB_TIME_COLUMNS
+        )
+        return df.merge(hltb_df, on='appid', how='left')
@@ -0,0 +1,167 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics
+
+#(connect, read) timeout in seconds
+TIMEOUT = (5, 30)
+#retries after the first attempt
+MAX_RETRIES = 4
+#exponential backoff: base * 2^attempt seconds, never more than BACKOFF_MAX
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+#answers that are worth trying again
+RETRY_STATUS = {429, 500, 502, 503, 504}
+#open connections kept alive per host, at least the number of collection threads
+POOL_SIZE = 16
+
+#circuit breaker: after this many failures in a row the endpoint is paused
+FAILURE_THRESHOLD = 5
+#seconds before trying again an endpoint with the circuit open
+RESET_TIMEOUT = 60.0
+
+
+#raised when an endpoint has failed too many times and is paused
+class CircuitOpenError(Exception):
+    pass
+
+
+#stops calling an endpoint that keeps failing, and lets one call through after a pause
+class CircuitBreaker:
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        #half open: one trial call is running, the other callers are refused until it ends
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            #a failed trial call opens the circuit for another pause
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    #the trial call ended without telling if the endpoint works (e.g. throttled), another one can be made
+    def release(self):
+        with self.lock:
+            self.probing = False
+
+
+#seconds to wait from a Retry-After header (seconds or http date), None if missing
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+#exponential backoff with full jitter, so threads do not retry at the same time
+def backoff_seconds(attempt, base=BACKOFF_BASE, maximum=BACKOFF_MAX):
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+#shared http session with keep-alive, timeouts, retries and one circuit breaker per endpoint
+#limiters is an optional dictionary endpoint -> TokenBucket
+class HttpClient:
+    def __init__(self, limiters=None, timeout=TIMEOUT, retries=MAX_RETRIES, pool_size=POOL_SIZE):
+        self.limiters = limiters or {}
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def breaker(self, endpoint):
+        with self.lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker()
+            return self.breakers[endpoint]
+
+    #get with retries, returns the last response or raises the last connection error
+    def get(self, endpoint, url, params=None):
+        breaker = self.breaker(endpoint)
+        limiter = self.limiters.get(endpoint)
+
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            if not breaker.allow():
+                metrics.count(f"http.{endpoint}.circuit_open")
+                raise CircuitOpenError(f"Circuito abierto para {endpoint}")
+            if limiter is not None:
+                limiter.acquire()
+
+            #latency of every attempt, retries included
+            metrics.count(f"http.{endpoint}.requests")
+            if attempt:
+                metrics.count(f"http.{endpoint}.retries")
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException:
+                metrics.observe(endpoint, time.perf_counter() - start)
+                metrics.count(f"http.{endpoint}.connection_errors")
+                breaker.record_failure()
+                if last:
+                    raise
+                time.sleep(backoff_seconds(attempt))
+                continue
+
+            metrics.observe(endpoint, time.perf_counter() - start)
+            if response.status_code == 429:
+                #throttling is not a failure of the endpoint, so the circuit stays closed
+                metrics.count(f"http.{endpoint}.status_429")
+                breaker.release()
+                if last:
+                    return response
+                #every thread of the endpoint waits, not only this one
+                wait = retry_after_seconds(response)
+                wait = wait if wait is not None else backoff_seconds(attempt)
+                if limiter is not None:
+                    limiter.pause(wait)
+                else:
+                    time.sleep(wait)
+                continue
+            if response.status_code in RETRY_STATUS:
+                metrics.count(f"http.{endpoint}.status_{response.status_code}")
+                breaker.record_failure()
+                if last:
+                    return response
+                time.sleep(backoff_seconds(attempt))
+                continue
+
+            breaker.record_success()
+            return response
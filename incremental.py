@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+
+from storage import load_dataset, dataset_path, APP_COLUMNS, HLTB_COLUMNS
+
+#columns that change when a user plays a game
+CHANGE_COLUMNS = ['playtime_forever', 'rtime_last_played']
+
+
+#loads the dataset of the last run, None if there is no previous run
+def load_previous(path=None):
+    if path is None:
+        path = dataset_path()
+    if not os.path.exists(path):
+        return None
+    previous = load_dataset(path)
+    #plain strings so it can be merged with the new libraries
+    previous['participant_id'] = previous['participant_id'].astype(str)
+    return previous
+
+
+#reuses the achievement ratio of games that did not change since the last snapshot
+#returns the dataframe and a mask with the rows that need new achievements
+def reuse_achievements(df, previous):
+    keys = ['participant_id', 'appid']
+    cols = [c for c in CHANGE_COLUMNS if c in previous.columns]
+    old = previous[keys + cols + ['achievement_ratio']].drop_duplicates(subset=keys)
+    old = old.rename(columns={c: f"{c}_old" for c in cols + ['achievement_ratio']})
+    merged = df.merge(old, on=keys, how='left')
+
+    #new games are always fetched
+    changed = merged['achievement_ratio_old'].isna()
+    for c in cols:
+        current = merged[c] if c in merged.columns else pd.Series(float('nan'), index=merged.index)
+        changed |= current.fillna(-1) != merged[f"{c}_old"].fillna(-1)
+
+    df = df.copy()
+    df['achievement_ratio'] = merged['achievement_ratio_old'].where(~changed, 0.0).values
+    return df, changed.values
+
+
+#game level columns of the last run, one row per appid
+def previous_app_data(previous):
+    #store metadata and hltb
+    cols = [c for c in APP_COLUMNS + HLTB_COLUMNS if c in previous.columns]
+    return previous[['appid'] + cols].drop_duplicates(subset=['appid'])
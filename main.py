@@ -1,75 +1,168 @@
+import argparse
+
 import pandas as pd
-import time
 
 from participants import participants
 
-from steam_api import get_owned_games_with_retry, get_game_metadata, get_achievement_ratio
-
-from utils import normalize_list_column, convert_playtime_minutes_to_hours, add_hltb_data
-
-all_data = []
-metadata_list = []
-
-#for every user name and id get games
-for user_id, steam_id in participants.items():
-    print(f"Descargando juegos para: {user_id}")
-    games = get_owned_games_with_retry(steam_id)
-    print(f"{user_id}: {len(games)} juegos encontrados") #number of games for user
-    #if not games, continue to next user
-    if not games:
-        continue
-
-    #creates dataframe with user id and converts playtime from minutes to hours
-    df = pd.DataFrame(games)
-    df['participant_id'] = user_id
-    df = convert_playtime_minutes_to_hours(df)
-
-    #achievements
-    achievement_ratios = []
-    #get achievement ratio for every game
-    for appid in df['appid']:
-        ratio = get_achievement_ratio(steam_id, appid)
-        #if there is no value, return 0.0
-        achievement_ratios.append(ratio if ratio is not None else 0.0)
-        time.sleep(0.2)  #to avoid problems with the api
-    #add column to df
-    df['achievement_ratio'] = achievement_ratios
-    all_data.append(df)
-
-    #gets data of unique games
-    for appid in df['appid'].unique():
-        meta = get_game_metadata(appid)
-        if meta:
-            #creates dictionary
-            metadata_list.append({
-                "appid": appid,
-                "name": meta.get("name", ""),
-                "type": meta.get("type", ""),
-                "genres": ", ".join([g["description"] for g in meta.get("genres", [])]) if "genres" in meta else "",
-                "categories": ", ".join([c["description"] for c in meta.get("categories", [])]) if "categories" in meta else "",
-                "release_date": meta.get("release_date", {}).get("date", ""),
-                "developer": ", ".join(meta.get("developers", [])) if "developers" in meta else "",
-                "publisher": ", ".join(meta.get("publishers", [])) if "publishers" in meta else ""
-            })
-        time.sleep(0.2)#to avoid problems with the api
-
-#fuse df
-df_all = pd.concat(all_data, ignore_index=True)
-df_meta = pd.DataFrame(metadata_list)
-#merge df with metadata
-df_final = df_all.merge(df_meta, on="appid", how="left")
-
-##normalize genres and categories
-df_final['genres'] = normalize_list_column(df_final['genres'])
-df_final['categories'] = normalize_list_column(df_final['categories'])
-
-#remove duplicates
-df_final = df_final.drop_duplicates(subset=['appid', 'participant_id'])
-
-#add hltb (howlongtobeat) data
-print(df_final.columns)
-df_final = add_hltb_data(df_final, game_name_col='name_y')
-
-#save csv
-df_final.to_csv("data/steam_data.csv", index=False)
-print("Datos guardados en data/steam_data.csv") #confirmation message
+from collector import collect_libraries, library_to_df, collect_achievements, collect_metadata, METADATA_COLUMNS
+
+from utils import normalize_list_column, add_hltb_data
+
+from cache import get_default_cache
+
+from incremental import load_previous, reuse_achievements, previous_app_data
+
+from checkpoints import save_checkpoint, load_checkpoint, clear_checkpoints
+
+from storage import save_dataset, DATA_PATH, CSV_PATH
+
+from metrics import metrics, report_path
+
+#downloads libraries, achievements, metadata and hltb data of all the participants and saves the dataset
+#incremental reuses the previous dataset and only downloads what changed
+#resume continues an interrupted run from its checkpoints
+def collect(incremental=False, resume=False):
+    #a new run starts without checkpoints
+    if not resume:
+        clear_checkpoints()
+
+    previous = load_previous() if incremental else None
+    if previous is not None:
+        print(f"Modo incremental: {len(previous)} filas previas")
+
+    # ------------------- STAGE 1: LIBRARIES -------------------
+    metrics.mark("libraries")
+    #libraries already saved in a previous attempt are not downloaded again
+    saved_libraries = {user_id: load_checkpoint("libraries", user_id) for user_id in participants}
+    pending = {user_id: steam_id for user_id, steam_id in participants.items() if saved_libraries[user_id] is None}
+    if len(pending) < len(participants):
+        print(f"Reanudando: {len(participants) - len(pending)} bibliotecas ya descargadas")
+
+
+    #each library is saved as soon as it arrives
+    def save_library(user_id, games):
+        if games:
+            save_checkpoint("libraries", user_id, games)
+
+
+    #for every user name and id get games (concurrent, rate limited per endpoint)
+    downloaded = {user_id: games for user_id, _, games in collect_libraries(pending, on_done=save_library)}
+    libraries = [(user_id, steam_id, saved_libraries[user_id] or downloaded.get(user_id, []))
+                 for user_id, steam_id in participants.items()]
+
+    # ------------------- STAGE 2: ACHIEVEMENTS -------------------
+    metrics.mark("achievements")
+    all_data = []
+    kept_data = []
+    for user_id, steam_id, games in libraries:
+        #if not games, continue to next user
+        if not games:
+            #in incremental mode the previous data of the user is kept
+            if previous is not None:
+                kept_data.append(previous[previous['participant_id'] == user_id])
+            continue
+
+        #creates dataframe with user id and converts playtime from minutes to hours
+        df = library_to_df(user_id, games)
+
+        #achievements already saved for this user
+        saved = load_checkpoint("achievements", user_id)
+        if saved is not None:
+            df['achievement_ratio'] = df['appid'].map(dict(saved)).fillna(0.0)
+            all_data.append(df)
+            continue
+
+        #achievements for games that can have them
+        if previous is not None:
+            #only games played since the last snapshot are asked again
+            df, changed = reuse_achievements(df, previous)
+            print(f"{user_id}: {changed.sum()} juegos con cambios")
+            if changed.any():
+                df.loc[changed, 'achievement_ratio'] = collect_achievements(steam_id, df[changed])
+        else:
+            df['achievement_ratio'] = collect_achievements(steam_id, df)
+        save_checkpoint("achievements", user_id, [[int(a), float(r)] for a, r in zip(df['appid'], df['achievement_ratio'])])
+        all_data.append(df)
+
+    #fuse df
+    df_all = pd.concat(all_data, ignore_index=True)
+
+    # ------------------- STAGE 3: METADATA -------------------
+    metrics.mark("metadata")
+    #games already in the previous dataset reuse their metadata and hltb data
+    if previous is not None:
+        app_data = previous_app_data(previous)
+        is_new = ~df_all['appid'].isin(app_data['appid'])
+    else:
+        app_data = None
+        is_new = pd.Series(True, index=df_all.index)
+
+    #games shared by many participants are only requested once
+    #each answer is stored in the persistent cache, so a resumed run does not ask again
+    unique_appids = df_all.loc[is_new, 'appid'].unique()
+    print(f"Descargando metadatos: {len(unique_appids)} juegos únicos de {len(df_all)} filas")
+    df_meta = pd.DataFrame(collect_metadata(unique_appids), columns=METADATA_COLUMNS)
+
+    # ------------------- STAGE 4: JOIN -------------------
+    metrics.mark("join")
+    #merge df with metadata
+    df_final = df_all[is_new].merge(df_meta, on="appid", how="left")
+
+    ##normalize genres and categories
+    df_final['genres'] = normalize_list_column(df_final['genres'])
+    df_final['categories'] = normalize_list_column(df_final['categories'])
+
+    #remove duplicates
+    df_final = df_final.drop_duplicates(subset=['appid', 'participant_id'])
+
+    #add hltb (howlongtobeat) data
+    print(df_final.columns)
+    metrics.mark("hltb")
+    df_final = add_hltb_data(df_final, game_name_col='name_y')
+    metrics.mark("merge")
+
+    #merge the new games with the known ones
+    if previous is not None:
+        df_known = df_all[~is_new].rename(columns={'name': 'name_x'}).merge(app_data, on="appid", how="left")
+        df_final = pd.concat([df_known, df_final] + kept_data, ignore_index=True)
+        df_final = df_final.drop_duplicates(subset=['appid', 'participant_id'])
+        #rows of each participant together, so the analysis can read one participant at a time
+        df_final = df_final.sort_values('participant_id', kind='stable')
+        #same column order as the previous dataset
+        columns = list(previous.columns) + [c for c in df_final.columns if c not in previous.columns]
+        df_final = df_final.reindex(columns=columns)
+
+    #save the parquet tables for the analysis and csv as export
+    metrics.mark("save")
+    save_dataset(df_final, DATA_PATH)
+    save_dataset(df_final, CSV_PATH)
+    print(f"Datos guardados en {DATA_PATH} y {CSV_PATH}") #confirmation message
+
+    #the run is complete, checkpoints are not needed anymore
+    clear_checkpoints()
+
+    #cache usage for store metadata and hltb (pending access times are written first)
+    cache = get_default_cache()
+    cache.flush()
+    stats = cache.stats()
+    print(f"Caché: {stats['hits']} aciertos, {stats['misses']} fallos ({stats['hit_rate']:.1%})")
+
+    #run report with stage times, http latencies, retries and cache usage
+    metrics.add_cache("response_cache", stats)
+    print(f"Informe de la ejecución en {metrics.save(report_path('main'))}")
+
+    return df_final
+
+
+if __name__ == "__main__":
+    #--incremental reuses the previous dataset and only downloads what changed
+    parser = argparse.ArgumentParser(description="Descarga de datos de Steam")
+    parser.add_argument("--incremental", action="store_true", help="solo descarga los datos que han cambiado")
+    #--resume continues an interrupted run from its checkpoints
+    parser.add_argument("--resume", action="store_true", help="continúa una ejecución interrumpida")
+    #--profile saves a cProfile dump of the given stages (see metrics.py)
+    parser.add_argument("--profile", nargs="+", default=[], metavar="ETAPA", help="etapas a perfilar con cProfile")
+    args = parser.parse_args()
+    metrics.profile_stages.update(args.profile)
+
+    collect(args.incremental, args.resume)
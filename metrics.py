@@ -0,0 +1,188 @@
+import cProfile
+import functools
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+#run reports and profiles of the stages
+REPORT_DIR = "output/reports"
+
+#upper bounds (seconds) of the latency histogram buckets, the last bucket has no bound
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+#stages to profile with cProfile, also from PROFILE_STAGES="stage1,stage2" ("all" for every stage)
+PROFILE_STAGES = set(filter(None, os.environ.get("PROFILE_STAGES", "").split(",")))
+
+
+#latency histogram of one endpoint
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "count": self.count,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "max_s": self.max,
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+
+#metrics of one run: stage times, call counts and times, counters, http latencies and cache usage
+#thread safe, the collection threads record into the same object
+class Metrics:
+    def __init__(self, profile_stages=None, profile_dir=REPORT_DIR):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}
+        self.calls = {}
+        self.counters = {}
+        self.latency = {}
+        self.caches = {}
+        self.profile_stages = set(PROFILE_STAGES if profile_stages is None else profile_stages)
+        self.profile_dir = profile_dir
+        self.current = None
+        #profiles of the worker threads of the stage being profiled (None if there is none)
+        self.worker_profiles = None
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, endpoint, seconds):
+        with self.lock:
+            if endpoint not in self.latency:
+                self.latency[endpoint] = LatencyHistogram()
+            self.latency[endpoint].observe(seconds)
+
+    def add_call(self, name, seconds):
+        with self.lock:
+            calls = self.calls.setdefault(name, {"count": 0, "total_s": 0.0})
+            calls["count"] += 1
+            calls["total_s"] += seconds
+
+    #cache statistics (a dictionary like ResponseCache.stats()) included in the report
+    def add_cache(self, name, stats):
+        with self.lock:
+            self.caches[name] = dict(stats)
+
+    #wall time of a block, profiled with cProfile if the stage is in profile_stages
+    #cProfile only sees its own thread, so the work of the thread pools is profiled in the workers
+    #(see profiled) and merged into the same dump
+    @contextmanager
+    def stage(self, name):
+        profiler = None
+        if name in self.profile_stages or "all" in self.profile_stages:
+            outer_profiles, self.worker_profiles = self.worker_profiles, []
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self.lock:
+                stage = self.stages.setdefault(name, {"count": 0, "total_s": 0.0})
+                stage["count"] += 1
+                stage["total_s"] += seconds
+            if profiler is not None:
+                profiler.disable()
+                with self.lock:
+                    workers, self.worker_profiles = self.worker_profiles, outer_profiles
+                stats = pstats.Stats(profiler)
+                if workers:
+                    stats.add(*workers)
+                os.makedirs(self.profile_dir, exist_ok=True)
+                stats.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+
+    #func profiled on its own when it runs in a worker thread of a profiled stage
+    #returns func as it is if no stage is being profiled
+    def profiled(self, func):
+        profiles = self.worker_profiles
+        if profiles is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                with self.lock:
+                    profiles.append(profiler)
+        return wrapper
+
+    #sequential stages for scripts: closes the stage in course and starts the next one (None only closes)
+    def mark(self, name):
+        if self.current is not None:
+            self.current.__exit__(None, None, None)
+            self.current = None
+        if name is not None:
+            self.current = self.stage(name)
+            self.current.__enter__()
+
+    #decorator counting the calls of a function and their total time
+    def timed(self, name=None):
+        def decorator(func):
+            label = name or f"{func.__module__}.{func.__name__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add_call(label, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def report(self):
+        #ru_maxrss is in kilobytes on linux and in bytes on macos
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss_mb = rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+        with self.lock:
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "wall_s": time.time() - self.started,
+                "peak_rss_mb": round(rss_mb, 1),
+                "stages": {k: dict(v) for k, v in self.stages.items()},
+                "calls": {k: dict(v) for k, v in self.calls.items()},
+                "counters": dict(self.counters),
+                "http_latency": {k: v.to_dict() for k, v in self.latency.items()},
+                "caches": dict(self.caches)
+            }
+
+    #writes the report as json, closing the stage in course
+    def save(self, path):
+        self.mark(None)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=1)
+        return path
+
+
+#metrics of the current process, shared by all modules
+metrics = Metrics()
+
+
+#path of the report of a script
+def report_path(script):
+    return os.path.join(REPORT_DIR, f"{script}.json")
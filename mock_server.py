@@ -0,0 +1,178 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from hltb import normalize_title
+
+#first steam id of the synthetic participants
+BASE_STEAM_ID = 76561198000000000
+
+
+#text of a recorded value, empty if missing
+def text(value):
+    return "" if value != value or value is None else str(value)
+
+
+#fixtures of a synthetic cohort built from the recorded dataset (steam_data.csv)
+#every participant gets a sample of the recorded games with random playtime
+#returns a dictionary with participants, owned games, apps, schemas, achievements and hltb results
+def build_fixtures(n_users, dataset=None, mean_games=150, private_rate=0.1, seed=0):
+    from storage import load_dataset
+
+    rng = random.Random(seed)
+    df = load_dataset(dataset)
+    apps = df.drop_duplicates(subset=['appid'])
+    hours = df['playtime_forever'].dropna().astype(int).tolist()
+
+    fixtures = {"participants": {}, "owned": {}, "private": [], "apps": {}, "schemas": {}, "hltb": {}}
+    for _, app in apps.iterrows():
+        appid = str(int(app['appid']))
+        fixtures["apps"][appid] = {
+            "type": text(app.get('type')),
+            "name": str(app['name_x']),
+            "genres": [{"description": g} for g in app['genres'] if g],
+            "categories": [{"description": c} for c in app['categories'] if c],
+            "release_date": {"date": text(app.get('release_date'))},
+            "developers": [text(app.get('developer'))] if text(app.get('developer')) else [],
+            "publishers": [text(app.get('publisher'))] if text(app.get('publisher')) else []
+        }
+        #recorded games with achievements keep a schema, the rest have none
+        has_stats = app.get('has_community_visible_stats') == True
+        fixtures["schemas"][appid] = rng.randint(10, 60) if has_stats else 0
+        if app.get('hltb_main_story') == app.get('hltb_main_story'):
+            #searches arrive with normalized titles
+            fixtures["hltb"][normalize_title(str(app['name_x']))] = {
+                "game_name": str(app['name_x']), "similarity": 1.0,
+                "main_story": float(app['hltb_main_story']),
+                "main_extra": float(app['hltb_main_extra']),
+                "completionist": float(app['hltb_completionist'])
+            }
+
+    appids = list(fixtures["apps"])
+    for i in range(n_users):
+        steam_id = str(BASE_STEAM_ID + i)
+        fixtures["participants"][f"User{i + 1}"] = steam_id
+        count = min(len(appids), max(1, int(rng.expovariate(1 / mean_games))))
+        fixtures["owned"][steam_id] = [{
+            "appid": int(appid),
+            "name": fixtures["apps"][appid]["name"],
+            "playtime_forever": rng.choice(hours),
+            "has_community_visible_stats": fixtures["schemas"][appid] > 0,
+            "rtime_last_played": 0
+        } for appid in rng.sample(appids, count)]
+        if rng.random() < private_rate:
+            fixtures["private"].append(steam_id)
+    return fixtures
+
+
+#local stand-in for the steam web api, the store and a howlongtobeat search endpoint
+#latency (seconds), error_rate (answers 500) and throttle_rate (answers 429 with Retry-After) are configurable
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixtures, port=0, latency=0.0, error_rate=0.0, throttle_rate=0.0, seed=0):
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    #serves in a background thread
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, data, status=200, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            roll = server.random.random()
+        if server.latency:
+            time.sleep(server.latency)
+        if roll < server.throttle_rate:
+            return self.send_json({}, 429, {"Retry-After": "1"})
+        if roll < server.throttle_rate + server.error_rate:
+            return self.send_json({}, 500)
+
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        fixtures = server.fixtures
+
+        if url.path.startswith("/IPlayerService/GetOwnedGames"):
+            games = fixtures["owned"].get(params.get("steamid"), [])
+            return self.send_json({"response": {"game_count": len(games), "games": games}})
+
+        if url.path.startswith("/ISteamUserStats/GetSchemaForGame"):
+            count = fixtures["schemas"].get(params.get("appid"), 0)
+            achievements = [{"name": f"ACH_{i}"} for i in range(count)]
+            return self.send_json({"game": {"availableGameStats": {"achievements": achievements}} if count else {}})
+
+        if url.path.startswith("/ISteamUserStats/GetPlayerAchievements"):
+            if params.get("steamid") in fixtures["private"]:
+                return self.send_json({"playerstats": {"error": "Profile is not public", "success": False}}, 403)
+            count = fixtures["schemas"].get(params.get("appid"), 0)
+            if not count:
+                return self.send_json({"playerstats": {"error": "Requested app has no stats", "success": False}}, 400)
+            #same answer for the same user and game
+            rng = random.Random(f"{params.get('steamid')}-{params.get('appid')}")
+            achievements = [{"apiname": f"ACH_{i}", "achieved": int(rng.random() < 0.4)} for i in range(count)]
+            return self.send_json({"playerstats": {"achievements": achievements, "success": True}})
+
+        if url.path.startswith("/api/appdetails"):
+            appid = params.get("appids")
+            data = fixtures["apps"].get(appid)
+            return self.send_json({appid: {"success": True, "data": data} if data else {"success": False}})
+
+        if url.path.startswith("/hltb/search"):
+            result = fixtures["hltb"].get(normalize_title(params.get("title", "")))
+            return self.send_json([result] if result else [])
+
+        return self.send_json({}, 404)
+
+
+#runs the server until ctrl-c, printing the environment variables to use it
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que imita Steam y HowLongToBeat")
+    parser.add_argument("--users", type=int, default=10, help="participantes sintéticos")
+    parser.add_argument("--fixtures", help="json de fixtures grabadas (si no, se generan desde los datos)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="segundos de latencia por petición")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="proporción de respuestas 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="proporción de respuestas 429")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        with open(args.fixtures, encoding="utf-8") as f:
+            fixtures = json.load(f)
+    else:
+        fixtures = build_fixtures(args.users)
+    server = MockServer(fixtures, args.port, args.latency, args.error_rate, args.throttle_rate)
+    print(f"STEAM_API_URL={server.url} STORE_API_URL={server.url} HLTB_SEARCH_URL={server.url}/hltb/search")
+    server.serve_forever()
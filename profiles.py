@@ -1,10 +1,19 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 from collections import Counter
 from math import pi
 
+from storage import to_list
+
+from tags import TagColumn, TAGS
+
+from tag_matcher import MotiveMatcher
+
+from render import render_figures
+
+from metrics import metrics
+
 #tags are obtained from print_unique_tags in exploration.py
 #group genres for Yee map
 YEE_MAP = {
@@ -27,6 +36,10 @@ BARTLE_MAP = {
     'Socializer': ['multi-player', 'online co-op', 'co-op', 'shared/split screen', 'remote play together', 'кооператив', 'multijogador', 'multigiocatore', 'для нескольких игроков', '멀티플레이어', '远程同乐', '协同作战']
 }
 
+#matchers compiled once for each map, shared by every scoring call
+YEE_MATCHER = MotiveMatcher(YEE_MAP)
+BARTLE_MATCHER = MotiveMatcher(BARTLE_MAP)
+
 
 # ------------------- FUNCTIONS -------------------
 
@@ -41,16 +54,8 @@ def count_motivation_points(row, map_dict):
     tags = []
     #iterates fot the clolumns genres and categories
     for col in ('genres', 'categories'):
-        #gets value, default = empty
-        cell = row.get(col, [])
-        #if is a string
-        if isinstance(cell, str):
-            try:
-                import ast
-                #convert to list
-                cell = ast.literal_eval(cell)
-            except:
-                cell = []
+        #gets value as list, default = empty
+        cell = to_list(row.get(col, []))
         for tag in cell:
             #add tag to list without spaces and in lowercase
             tags.append(tag.strip().lower())
@@ -73,37 +78,77 @@ def count_motivation_points(row, map_dict):
 
 
 
+#tags of every row as (row position, tag code) pairs and the vocabulary of unique tags
+#tags are stripped and in lowercase, as in count_motivation_points
+def tag_codes(df):
+    rows, codes = [], []
+    for col in ('genres', 'categories'):
+        if col in df.columns:
+            #csv cells are strings, lists are returned as they are (rows sharing a list stay shared)
+            col_rows, col_codes = TagColumn.from_series(df[col].map(to_list)).explode()
+            rows.append(col_rows)
+            codes.append(col_codes)
+    if not rows:
+        return np.array([], dtype=int), np.array([], dtype=int), []
+    rows, codes = np.concatenate(rows), np.concatenate(codes)
+    #strip and lowercase only the unique tags, then merge the ones that become equal
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+    clean = pd.Index([str(tag) for tag in TAGS.decode(unique_codes)]).str.strip().str.lower()
+    clean_codes, vocab = pd.factorize(clean)
+    return rows, clean_codes[inverse], list(vocab)
+
+
+#same points as count_motivation_points for every row, computed with numpy
+#matcher is a MotiveMatcher (or a motivation map, compiled on the fly)
+@metrics.timed()
+def score_motivations(df, matcher, rows=None, codes=None, vocab=None):
+    if not isinstance(matcher, MotiveMatcher):
+        matcher = MotiveMatcher(matcher)
+    if rows is None:
+        rows, codes, vocab = tag_codes(df)
+    n = len(df)
+    #motives of each unique tag, expanded to every (row, tag) pair
+    incidence = matcher.incidence(vocab)[codes]
+
+    #weights of each row, 0 if the column does not exist
+    weight = df['playtime_hours'].astype(float).to_numpy() if 'playtime_hours' in df.columns else np.zeros(n)
+    achievements = df['achievement_ratio'].astype(float).to_numpy() if 'achievement_ratio' in df.columns else np.zeros(n)
+
+    scores = np.zeros((n, len(matcher.motives)))
+    for j, motive in enumerate(matcher.motives):
+        #a motive counts once per row if any of its tags matches
+        hit = np.bincount(rows, weights=incidence[:, j], minlength=n) > 0
+        #for achiever motivation multiplies by the obtained ratio
+        value = weight * achievements if motive.lower() in ['achievement', 'achiever'] else weight
+        scores[:, j] = np.where(hit, value, 0.0)
+
+    return pd.DataFrame(scores, columns=matcher.motives, index=df.index)
+
+
+@metrics.timed()
 def compute_profiles(df):
-    #groups by participant id and uses count_motivation_points for each group for Yee
-    yee_df = df.groupby('participant_id', group_keys=False).apply(
-        lambda group: group.apply(count_motivation_points, axis=1, args=(YEE_MAP,)).sum()
-    )
-    #groups by participant id and uses count_motivation_points for each group for Bartle
-    bartle_df = df.groupby('participant_id', group_keys=False).apply(
-        lambda group: group.apply(count_motivation_points, axis=1, args=(BARTLE_MAP,)).sum()
-    )
+    #tags are extracted once and shared by both maps
+    rows, codes, vocab = tag_codes(df)
+    participant = participant_key(df)
+
+    #points of every row, summed by participant id for Yee
+    yee_df = score_motivations(df, YEE_MATCHER, rows, codes, vocab).groupby(participant).sum()
+    #points of every row, summed by participant id for Bartle
+    bartle_df = score_motivations(df, BARTLE_MATCHER, rows, codes, vocab).groupby(participant).sum()
 
     return yee_df, bartle_df
 
 
 
 # ------------------- VISUALIZATIONS -------------------
+#matplotlib is imported inside the plotting functions, so the stats can be computed without loading it
 
 
 
-def save_yee_radar_png(yee_df, player_id, output_dir="output"):
-
-    print(f"Generando yee para {player_id}")
-    os.makedirs(output_dir, exist_ok=True)
-
-    #normalizes values
-    yee_normalized = yee_df.div(yee_df.sum(axis=1), axis=0)
-    player_values = yee_normalized.loc[player_id].values
-    #calculates average values for the group
-    avg_values = yee_normalized.mean().values
+#draws the radar of a player against the group average
+def draw_yee_radar(path, player_id, labels, player_values, avg_values):
+    import matplotlib.pyplot as plt
 
-    #get labels
-    labels = list(yee_df.columns)
     #count variales
     num_vars = len(labels)
 
@@ -129,40 +174,123 @@ def save_yee_radar_png(yee_df, player_id, output_dir="output"):
     ax.legend(loc='lower center', bbox_to_anchor=(0.5, -0.15))
     
     #save
-    filename = f"{player_id}_gmp_yee.png"
-    path = os.path.join(output_dir, filename)
     plt.tight_layout()
     plt.savefig(path)
     plt.close()
-    print(f"Creado") #confirmation
-    
-    
-    #print punctuations
-    print("Puntuaciones normalizadas Yee:") #users
-    for label, val in zip(labels, yee_normalized.loc[player_id]):
-        print(f"- {label}: {val:.2f}")
-    print("Media del grupo:") #avg
-    for label, val in zip(labels, yee_normalized.mean()):
-        print(f"- {label}: {val:.2f}")
+
+
+#normalized yee profiles, group mean and median and percentile ranks, computed once for all players
+#the bartle compass coordinates are computed once too
+#the radars, the compass and the printed reports read from the per-player views
+class ProfileReport:
+    def __init__(self, yee_df=None, bartle_df=None):
+        if yee_df is not None:
+            self.labels = list(yee_df.columns)
+            self.yee = yee_df.div(yee_df.sum(axis=1), axis=0)
+            self.yee_mean = self.yee.mean()
+            self.yee_median = self.yee.median()
+            #share of the group with the same value or lower, for every motivation
+            self.yee_percentiles = self.yee.rank(pct=True, method='max')
+        if bartle_df is not None:
+            self.bartle_x = bartle_df['Killer'] - bartle_df['Socializer']   #axis x action vs interaction
+            self.bartle_y = bartle_df['Achiever'] - bartle_df['Explorer']   #axis y world vs players
+
+    #values of one player (plain floats, ready for the radar payload)
+    def player(self, player_id):
+        return {
+            "player_id": str(player_id),
+            "labels": self.labels,
+            "values": [float(v) for v in self.yee.loc[player_id].values],
+            "percentiles": [float(v) for v in self.yee_percentiles.loc[player_id].values]
+        }
+
+    def group_mean(self):
+        return [float(v) for v in self.yee_mean.values]
+
+    def group_median(self):
+        return [float(v) for v in self.yee_median.values]
+
+    #compass coordinates, divided by the largest absolute value of each axis if normalize
+    def compass(self, normalize=True):
+        x, y = self.bartle_x, self.bartle_y
+        if normalize:
+            x = x / (np.abs(x).max() or 1)
+            y = y / (np.abs(y).max() or 1)
+        return x, y
+
+
+#group mean and median, printed once for all the players
+def print_yee_group(report):
+    print("Media y mediana del grupo (Yee normalizado):")
+    for label, mean, median in zip(report.labels, report.group_mean(), report.group_median()):
+        print(f"- {label}: {mean:.2f} | {median:.2f}")
     print("==========================================")
 
 
+#scores of a player with the percentile inside the group
+def print_yee_player(view):
+    print("Puntuaciones normalizadas Yee:")
+    for label, val, pct in zip(view["labels"], view["values"], view["percentiles"]):
+        print(f"- {label}: {val:.2f} (percentil {pct:.0%})")
+    print("==========================================")
 
-def plot_bartle_compass(bartle_df, normalize=True, save_path="output/bartle_compass.png"):
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
 
-    x = bartle_df['Killer'] - bartle_df['Socializer']   #axis x action vs interaction
-    y = bartle_df['Achiever'] - bartle_df['Explorer']   #axis y world vs players
+def save_yee_radar_png(yee_df, player_id, output_dir="output", report=None):
+
+    print(f"Generando yee para {player_id}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    #normalization and group average come from the report (computed here if not given)
+    if report is None:
+        report = ProfileReport(yee_df)
+    view = report.player(player_id)
+
+    filename = f"{player_id}_gmp_yee.png"
+    draw_yee_radar(os.path.join(output_dir, filename), view["player_id"], view["labels"], view["values"], report.group_mean())
+    print(f"Creado") #confirmation
 
-    #normalize values
-    if normalize:
-        x = x / (np.abs(x).max() or 1)
-        y = y / (np.abs(y).max() or 1)
+    print_yee_player(view)
+
+
+#radar for every player, rendered in parallel
+#normalization and group average are computed once for all players (see ProfileReport)
+#users limits the radars drawn, the average is still the one of the whole group
+@metrics.timed()
+def save_yee_radars(yee_df, output_dir="output", workers=None, users=None, report=None):
+    if report is None:
+        report = ProfileReport(yee_df)
+    avg_values = report.group_mean()
+    print_yee_group(report)
+
+    jobs = []
+    for player_id in yee_df.index if users is None else [u for u in yee_df.index if u in users]:
+        view = report.player(player_id)
+        print(f"Yee para {player_id}")
+        print_yee_player(view)
+        jobs.append((draw_yee_radar, f"{player_id}_gmp_yee.png", {
+            "player_id": view["player_id"], "labels": view["labels"],
+            "player_values": view["values"], "avg_values": avg_values
+        }))
+
+    render_figures(jobs, output_dir, workers)
+
+
+
+@metrics.timed()
+def plot_bartle_compass(bartle_df, normalize=True, save_path="output/bartle_compass.png", report=None):
+    import matplotlib.pyplot as plt
+
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+
+    #axis x action vs interaction, axis y world vs players (normalized if normalize)
+    if report is None:
+        report = ProfileReport(bartle_df=bartle_df)
+    x, y = report.compass(normalize)
 
     plt.figure(figsize=(10, 10))
     
     #point position for every participant
-    for user in bartle_df.index:
+    for user in x.index:
         plt.scatter(x[user], y[user], s=100)
         plt.text(x[user] + 0.03, y[user] + 0.03, user, fontsize=10)
 
@@ -201,165 +329,115 @@ def plot_bartle_compass(bartle_df, normalize=True, save_path="output/bartle_comp
 
 
 
-#TOP games and genres
-def plot_top_games_with_genres(df, output_dir="output"):
-    os.makedirs(output_dir, exist_ok=True)
+def draw_top_games_with_genres(path, user_id, names, hours, top_genres):
+    import matplotlib.pyplot as plt
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
     
-    users = df['participant_id'].unique()
+    ####playtime graph
+    bars1 = ax1.barh(range(len(hours)), hours, 
+                     color='skyblue', alpha=0.7)
+    ax1.set_yticks(range(len(hours)))
     
-    for user_id in users:
-        print(f"Creando para {user_id}")
-        
-        try:
-            user_data = df[df['participant_id'] == user_id]
-            top_games = user_data.nlargest(10, 'playtime_hours') #TOP 10 games
-            
-            #if no data for user
-            if len(top_games) == 0:
-                print(f"Error datos {user_id}")
-                continue
-            
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
-            
-            ####playtime graph
-            bars1 = ax1.barh(range(len(top_games)), top_games['playtime_hours'], 
-                             color='skyblue', alpha=0.7)
-            ax1.set_yticks(range(len(top_games)))
-            
-            #reduce long names
-            formatted_names = []
-            for name in top_games['name_x']:
-                    name_str = str(name)
-                    if len(name_str) > 30:
-                        formatted_names.append(name_str[:20] + '...')
-                    else:
-                        formatted_names.append(name_str)
-            
-            ax1.set_yticklabels(formatted_names, fontsize=14)
-            ax1.set_xlabel('Horas jugadas', fontsize=14)
-            ax1.set_title(f'Top 10 juegos más jugados - {user_id}', fontsize=18)
-            
-            #add values
-            for i, v in enumerate(top_games['playtime_hours']):
-                ax1.text(v + 0.5, i, f'{v:.1f}h', va='center', fontsize=12)
-            
-            ####genres graph
-            all_genres = []
-            for genres in top_games['genres']:
-                if pd.isna(genres):
-                    continue
-                elif isinstance(genres, list):
-                    all_genres.extend(genres)
-                elif isinstance(genres, str) and genres:
-                    try:
-                        import ast
-                        genres_list = ast.literal_eval(genres)
-                        if isinstance(genres_list, list):
-                            all_genres.extend(genres_list)
-                        else:
-                            all_genres.append(str(genres_list))
-                    except:
-                        all_genres.append(genres)
-            
-            genre_counts = Counter(all_genres)
-            top_genres = dict(genre_counts.most_common(8)) #TOP 8 genres
-            
-            if top_genres:
-                ax2.bar(range(len(top_genres)), list(top_genres.values()), 
-                        color='lightcoral', alpha=0.7)
-                ax2.set_xticks(range(len(top_genres)))
-                ax2.set_xticklabels(list(top_genres.keys()), rotation=45, ha='right', fontsize=14)
-                ax2.set_ylabel('Frecuencia', fontsize=14)
-                ax2.set_title(f'Géneros dominantes en juegos más jugados - {user_id}', fontsize=18)
+    #reduce long names
+    formatted_names = []
+    for name_str in names:
+            if len(name_str) > 30:
+                formatted_names.append(name_str[:20] + '...')
             else:
-                #if no data
-                ax2.text(0.5, 0.5, 'Sin datos disponibles', 
-                        ha='center', va='center', transform=ax2.transAxes)
-                ax2.set_title(f'Géneros dominantes - {user_id}')
-            
-            plt.tight_layout()
-            
-            #save
-            filename = f"{user_id}_games_and_genres.png"
-            path = os.path.join(output_dir, filename)
-            plt.savefig(path, dpi=600, bbox_inches='tight')
-            plt.close()
-            
-            #confirmation for individual user
-            print(f"Creado para {user_id}")
-            
-        except Exception as e:
-            print(f"Error en {user_id}")
+                formatted_names.append(name_str)
+    
+    ax1.set_yticklabels(formatted_names, fontsize=14)
+    ax1.set_xlabel('Horas jugadas', fontsize=14)
+    ax1.set_title(f'Top 10 juegos más jugados - {user_id}', fontsize=18)
+    
+    #add values
+    for i, v in enumerate(hours):
+        ax1.text(v + 0.5, i, f'{v:.1f}h', va='center', fontsize=12)
+    
+    ####genres graph
+    if top_genres:
+        ax2.bar(range(len(top_genres)), list(top_genres.values()), 
+                color='lightcoral', alpha=0.7)
+        ax2.set_xticks(range(len(top_genres)))
+        ax2.set_xticklabels(list(top_genres.keys()), rotation=45, ha='right', fontsize=14)
+        ax2.set_ylabel('Frecuencia', fontsize=14)
+        ax2.set_title(f'Géneros dominantes en juegos más jugados - {user_id}', fontsize=18)
+    else:
+        #if no data
+        ax2.text(0.5, 0.5, 'Sin datos disponibles', 
+                ha='center', va='center', transform=ax2.transAxes)
+        ax2.set_title(f'Géneros dominantes - {user_id}')
+    
+    plt.tight_layout()
+    
+    #save
+    plt.savefig(path, dpi=600, bbox_inches='tight')
+    plt.close()
+
+
+#TOP games and genres
+#uses the stats table (computed if not given) and renders in parallel, skipping unchanged figures
+@metrics.timed()
+def plot_top_games_with_genres(df, output_dir="output", workers=None, stats=None):
+    if stats is None:
+        stats = compute_user_stats(df)
+    jobs = []
+    for user_id, row in stats.iterrows():
+        #if no data for user
+        if not row['top_games']:
+            print(f"Error datos {user_id}")
             continue
+        jobs.append((draw_top_games_with_genres, f"{user_id}_games_and_genres.png", {
+            "user_id": str(user_id), "names": row['top_games'],
+            "hours": row['top_hours'], "top_genres": row['top_games_genres']
+        }))
+
+    render_figures(jobs, output_dir, workers)
     #confirmation for all users
     print(f"Creado para todos los usuarios")
 
 
-#genre distribution
-def plot_genre_distribution_histogram(df, output_dir="output"):
-    os.makedirs(output_dir, exist_ok=True)
+def draw_genre_histogram(path, user_id, top_genres):
+    import matplotlib.pyplot as plt
+
+    #create graph
+    plt.figure(figsize=(12, 6))
+    bars = plt.bar(range(len(top_genres)), list(top_genres.values()), 
+                   color='steelblue', alpha=0.7)
     
-    users = df['participant_id'].unique()
+    plt.xticks(range(len(top_genres)), list(top_genres.keys()), 
+               rotation=45, ha='right', fontsize=14)
+    plt.ylabel('Número de juegos')
+    plt.title(f'Distribución de géneros en la biblioteca - {user_id}', fontsize=18, fontweight='bold')
     
-    for user_id in users:
-        print(f"Creando para {user_id}")
-        
-        try:
-            user_data = df[df['participant_id'] == user_id]
-            
-            #extraer generos
-            all_genres = []
-            for genres in user_data['genres']:
-                if pd.isna(genres):
-                    continue
-                elif isinstance(genres, list):
-                    all_genres.extend(genres)
-                elif isinstance(genres, str) and genres:
-                    try:
-                        import ast
-                        genres_list = ast.literal_eval(genres)
-                        if isinstance(genres_list, list):
-                            all_genres.extend(genres_list)
-                        else:
-                            all_genres.append(str(genres_list))
-                    except:
-                        all_genres.append(genres)
-            
-            if not all_genres:
-                print(f"No hay géneros para {user_id}")
-                continue
-            
-            genre_counts = Counter(all_genres)
-            top_genres = dict(genre_counts.most_common(10)) #TOP 10
-            
-            #create graph
-            plt.figure(figsize=(12, 6))
-            bars = plt.bar(range(len(top_genres)), list(top_genres.values()), 
-                           color='steelblue', alpha=0.7)
-            
-            plt.xticks(range(len(top_genres)), list(top_genres.keys()), 
-                       rotation=45, ha='right', fontsize=14)
-            plt.ylabel('Número de juegos')
-            plt.title(f'Distribución de géneros en la biblioteca - {user_id}', fontsize=18, fontweight='bold')
-            
-            #add values on the bars
-            for bar, value in zip(bars, top_genres.values()):
-                plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1, 
-                        str(value), ha='center', va='bottom', fontsize=12)
-            
-            plt.tight_layout()
-            
-            #save in local
-            filename = f"{user_id}_genre_histogram.png"
-            path = os.path.join(output_dir, filename)
-            plt.savefig(path, dpi=600, bbox_inches='tight')
-            plt.close()
-            
-            print(f"Creado para {user_id}")
-            
-        except Exception as e:
-            print(f"Error en {user_id}")
+    #add values on the bars
+    for bar, value in zip(bars, top_genres.values()):
+        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1, 
+                str(value), ha='center', va='bottom', fontsize=12)
+    
+    plt.tight_layout()
+    
+    #save in local
+    plt.savefig(path, dpi=600, bbox_inches='tight')
+    plt.close()
+
+
+#genre distribution
+#uses the stats table (computed if not given) and renders in parallel, skipping unchanged figures
+@metrics.timed()
+def plot_genre_distribution_histogram(df, output_dir="output", workers=None, stats=None):
+    if stats is None:
+        stats = compute_user_stats(df)
+    jobs = []
+    for user_id, row in stats.iterrows():
+        top_genres = row['genre_counts'] #TOP 10
+        if not top_genres:
+            print(f"No hay géneros para {user_id}")
             continue
+        jobs.append((draw_genre_histogram, f"{user_id}_genre_histogram.png", {"user_id": str(user_id), "top_genres": top_genres}))
+
+    render_figures(jobs, output_dir, workers)
     #confirmation
     print(f"Creado para todos los usuarios")
 
@@ -367,35 +445,77 @@ def plot_genre_distribution_histogram(df, output_dir="output"):
 # ------------------- PROFILE REPORT -------------------
 
 
-def print_user_stats(df):
-    participants = df['participant_id'].unique()
-
-    #for each user and played games
-    for user in sorted(participants):
-        user_df = df[df['participant_id'] == user]
-        played_games = user_df[user_df['playtime_hours'] > 0]
-
-        #calculates
-        total_games = len(user_df) #number of games
-        num_played = len(played_games) #number of played games
-        total_playtime = played_games['playtime_hours'].sum() #total playtime
-        avg_playtime = played_games['playtime_hours'].mean() #average playtime hours
-        median_playtime = played_games['playtime_hours'].median() #playtime median
-
-        #achievemnts ratio
-        played_with_achievements = played_games[played_games['achievement_ratio'].notna()]
-        mean_achievement_ratio = played_with_achievements['achievement_ratio'].mean()
-
+#participant ids as plain values (categorical ids from parquet are converted)
+def participant_key(df):
+    participant = df['participant_id']
+    if isinstance(participant.dtype, pd.CategoricalDtype):
+        participant = participant.astype(participant.cat.categories.dtype)
+    return participant
+
+
+#counts genres of every participant in one pass, most common first
+#ties keep the order in which the genre first appears, like Counter.most_common
+def genre_counts_by_user(df, top_n):
+    rows, codes = TagColumn.from_series(df['genres'].map(to_list)).explode()
+    exploded = pd.DataFrame({
+        'participant_id': participant_key(df).to_numpy()[rows],
+        'genres': codes,
+        'position': np.arange(len(codes))
+    })
+    counts = exploded.groupby(['participant_id', 'genres'], sort=False).agg(
+        count=('position', 'size'), first=('position', 'min')).reset_index()
+    counts = counts.sort_values(['participant_id', 'count', 'first'], ascending=[True, False, True])
+    counts = counts.groupby('participant_id', sort=False).head(top_n)
+    return {user: dict(zip(TAGS.decode(group['genres']), group['count'].astype(int)))
+            for user, group in counts.groupby('participant_id', sort=False)}
+
+
+#stats of every participant computed with groupby in a single pass
+#returns a table indexed by participant id, shared by print_user_stats and the per-user plots
+@metrics.timed()
+def compute_user_stats(df, top_n=10):
+    df = df.assign(participant_id=participant_key(df))
+    users = df.groupby('participant_id')
+    played = df[df['playtime_hours'] > 0].groupby('participant_id')
+
+    stats = pd.DataFrame({'total_games': users.size()})
+    stats['num_played'] = played.size().reindex(stats.index, fill_value=0) #number of played games
+    stats['pct_played'] = stats['num_played'] / stats['total_games'] #percentaje of played games
+    stats['total_playtime'] = played['playtime_hours'].sum().reindex(stats.index, fill_value=0.0) #total playtime
+    stats['avg_playtime'] = played['playtime_hours'].mean() #average playtime hours
+    stats['median_playtime'] = played['playtime_hours'].median() #playtime median
+    stats['mean_achievement_ratio'] = played['achievement_ratio'].mean() #achievemnts ratio (played games)
+
+    #TOP games by hours (stable order, as nlargest)
+    top_games = (df.sort_values(['participant_id', 'playtime_hours'], ascending=[True, False], kind='stable')
+                 .groupby('participant_id').head(top_n))
+    top_groups = top_games.groupby('participant_id')
+    stats['top_games'] = top_groups['name_x'].agg(lambda names: [str(n) for n in names])
+    stats['top_hours'] = top_groups['playtime_hours'].agg(lambda hours: [float(h) for h in hours])
+
+    #TOP 8 genres of the top games and TOP 10 genres of the whole library
+    top_genres = genre_counts_by_user(top_games, 8)
+    genre_counts = genre_counts_by_user(df, 10)
+    stats['top_games_genres'] = [top_genres.get(user, {}) for user in stats.index]
+    stats['genre_counts'] = [genre_counts.get(user, {}) for user in stats.index]
+    return stats
+
+
+def print_user_stats(df, stats=None):
+    if stats is None:
+        stats = compute_user_stats(df)
+
+    #for each user
+    for user, row in stats.iterrows():
         #report
         print(f"Resultados para {user}") #user
-        print(f"- Juegos en la biblioteca: {total_games}") #number of games
-        print(f"- Juegos jugados: {num_played}") #number of played games
-        print(f"- Porcentaje jugados: {num_played / total_games:.1%}") #percentaje of played games
-        print(f"- Tiempo total jugado: {total_playtime:.1f} h") #total playtime
-        print(f"- Tiempo medio por juego: {avg_playtime:.1f} h") #average playtime hours
-        print(f"- Mediana de horas jugadas: {median_playtime:.1f} h") #median playtime
-        print(f"- Ratio medio de logros (juegos jugados): {mean_achievement_ratio:.2f}") #achievemnts ratio
+        print(f"- Juegos en la biblioteca: {row['total_games']}") #number of games
+        print(f"- Juegos jugados: {row['num_played']}") #number of played games
+        print(f"- Porcentaje jugados: {row['pct_played']:.1%}") #percentaje of played games
+        print(f"- Tiempo total jugado: {row['total_playtime']:.1f} h") #total playtime
+        print(f"- Tiempo medio por juego: {row['avg_playtime']:.1f} h") #average playtime hours
+        print(f"- Mediana de horas jugadas: {row['median_playtime']:.1f} h") #median playtime
+        print(f"- Ratio medio de logros (juegos jugados): {row['mean_achievement_ratio']:.2f}") #achievemnts ratio
         print("========================================")
 
-
-
+    return stats
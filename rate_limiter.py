@@ -0,0 +1,42 @@
+import threading
+import time
+
+
+#token bucket: allows bursts up to capacity and refills at rate tokens per second
+#shared between threads, so concurrent calls never go faster than the endpoint allows
+#pause stops every thread, e.g. when the endpoint answers 429 with Retry-After
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    #no tokens for the next seconds, and the bucket starts empty after the pause
+    def pause(self, seconds):
+        with self.lock:
+            until = time.monotonic() + seconds
+            if until > self.paused_until:
+                self.paused_until = until
+                self.tokens = 0
+                self.last = until
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    #time until the end of the pause
+                    wait = self.paused_until - now
+                else:
+                    #refill tokens for the elapsed time
+                    self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                    self.last = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    #time until next token
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from metrics import metrics
+
+#file in the output folder with the data hash of every rendered figure
+MANIFEST_NAME = ".render_manifest.json"
+
+
+#figures are only saved to png, so pool workers use the non interactive backend
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+#hash of the drawing function and the data of the figure
+def figure_hash(draw_func, payload):
+    text = json.dumps([draw_func.__module__, draw_func.__qualname__, payload], sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _draw(draw_func, path, payload):
+    draw_func(path=path, **payload)
+    return path
+
+
+#renders a list of jobs (draw_func, filename, payload) in a process pool
+#draw_func must be a module level function called as draw_func(path=..., **payload)
+#figures whose data did not change since the last render are skipped
+#returns the list of rendered paths
+def render_figures(jobs, output_dir="output", workers=None, force=False):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    pending = []
+    for draw_func, filename, payload in jobs:
+        path = os.path.join(output_dir, filename)
+        digest = figure_hash(draw_func, payload)
+        if not force and manifest.get(filename) == digest and os.path.exists(path):
+            print(f"Sin cambios: {filename}")
+            metrics.count("render.skipped")
+            continue
+        pending.append((draw_func, path, payload, filename, digest))
+
+    rendered = []
+    if not pending:
+        return rendered
+
+    def done(filename, digest, result):
+        try:
+            rendered.append(result())
+            manifest[filename] = digest
+            metrics.count("render.rendered")
+            print(f"Creado {filename}")
+        except Exception as e:
+            print(f"Error en {filename}: {e}")
+
+    #a single figure is drawn here, without starting processes
+    #the backend of the caller is not changed, the figures are saved and closed by the draw functions
+    if workers == 1 or len(pending) == 1:
+        for draw_func, path, payload, filename, digest in pending:
+            done(filename, digest, lambda: _draw(draw_func, path, payload))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = {executor.submit(_draw, draw_func, path, payload): (filename, digest)
+                       for draw_func, path, payload, filename, digest in pending}
+            for future in as_completed(futures):
+                filename, digest = futures[future]
+                done(filename, digest, future.result)
+
+    save_manifest(output_dir, manifest)
+    return rendered
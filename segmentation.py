@@ -0,0 +1,162 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from profiles import ProfileReport, BARTLE_MAP
+
+#saved model, so new participants update the clusters without clustering everybody again
+MODEL_PATH = "data/segments.json"
+
+N_CLUSTERS = 4
+BATCH_SIZE = 256
+
+
+#yee and bartle shares of every participant (each profile sums 1, like the radar)
+#returns a dataframe indexed by participant with the yee columns and the bartle columns
+def profile_vectors(yee_df, bartle_df):
+    yee = ProfileReport(yee_df).yee
+    bartle = bartle_df.div(bartle_df.sum(axis=1), axis=0)
+    #participants without hours have no profile
+    return pd.concat([yee, bartle], axis=1).fillna(0.0)
+
+
+#mini-batch k-means (Sculley, 2010) with numpy
+#every centroid moves towards the points of the batch with a learning rate 1 / points seen
+#partial_fit can be called with new participants at any time, the centroids are only updated
+class MiniBatchKMeans:
+    def __init__(self, n_clusters=N_CLUSTERS, batch_size=BATCH_SIZE, seed=0):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.random = np.random.default_rng(seed)
+        self.centroids = None
+        self.counts = np.zeros(n_clusters)
+
+    #closest centroid of every row and its squared distance
+    def _closest(self, X):
+        distances = ((X[:, None, :] - self.centroids[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        return labels, distances[np.arange(len(X)), labels]
+
+    #k-means++: the first centroid at random, the next ones far from the chosen ones
+    def _init(self, X):
+        centroids = [X[self.random.integers(len(X))]]
+        for _ in range(1, self.n_clusters):
+            distances = ((X[:, None, :] - np.array(centroids)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+            total = distances.sum()
+            p = distances / total if total > 0 else None
+            centroids.append(X[self.random.choice(len(X), p=p)])
+        self.centroids = np.array(centroids, dtype=np.float64)
+
+    #updates the centroids with the rows of X, batch by batch
+    def partial_fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if self.centroids is None:
+            if len(X) < self.n_clusters:
+                raise ValueError(f"Se necesitan al menos {self.n_clusters} participantes para empezar")
+            self._init(X)
+        for start in range(0, len(X), self.batch_size):
+            batch = X[start:start + self.batch_size]
+            labels, _ = self._closest(batch)
+            #same as moving the centroid point by point with rate 1 / count: running mean of its points
+            for label in np.unique(labels):
+                points = batch[labels == label]
+                self.counts[label] += len(points)
+                self.centroids[label] += (points.sum(axis=0) - len(points) * self.centroids[label]) / self.counts[label]
+        return self
+
+    #several passes over X in random order
+    def fit(self, X, epochs=10):
+        X = np.asarray(X, dtype=np.float64)
+        for _ in range(epochs):
+            self.partial_fit(X[self.random.permutation(len(X))])
+        return self
+
+    def predict(self, X):
+        return self._closest(np.asarray(X, dtype=np.float64))[0]
+
+    #sum of squared distances to the closest centroid
+    def inertia(self, X):
+        return float(self._closest(np.asarray(X, dtype=np.float64))[1].sum())
+
+    def to_dict(self):
+        return {
+            "n_clusters": self.n_clusters,
+            "batch_size": self.batch_size,
+            "centroids": self.centroids.tolist() if self.centroids is not None else None,
+            "counts": self.counts.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls(data["n_clusters"], data["batch_size"])
+        if data["centroids"] is not None:
+            model.centroids = np.array(data["centroids"], dtype=np.float64)
+        model.counts = np.array(data["counts"], dtype=np.float64)
+        return model
+
+
+#segmentation of the participants: model, columns of the vectors and participants already used
+class PlayerSegments:
+    def __init__(self, n_clusters=N_CLUSTERS, batch_size=BATCH_SIZE, seed=0):
+        self.model = MiniBatchKMeans(n_clusters, batch_size, seed)
+        self.columns = None
+        self.known = set()
+
+    #clusters all the given participants (vectors from profile_vectors)
+    def fit(self, vectors, epochs=10):
+        self.columns = list(vectors.columns)
+        self.model.fit(vectors.to_numpy(), epochs)
+        self.known = set(vectors.index)
+        return self
+
+    #only the participants not seen before move the centroids
+    #returns the number of new participants
+    def update(self, vectors):
+        if self.columns is None:
+            self.fit(vectors)
+            return len(vectors)
+        new = vectors[~vectors.index.isin(list(self.known))].reindex(columns=self.columns, fill_value=0.0)
+        if len(new):
+            self.model.partial_fit(new.to_numpy())
+            self.known.update(new.index)
+        return len(new)
+
+    #cluster of every participant
+    def assign(self, vectors):
+        vectors = vectors.reindex(columns=self.columns, fill_value=0.0)
+        return pd.Series(self.model.predict(vectors.to_numpy()), index=vectors.index, name='cluster')
+
+    def centroids(self):
+        return pd.DataFrame(self.model.centroids, columns=self.columns).rename_axis('cluster')
+
+    #size, mean profile and dominant yee motivation and bartle type of every cluster
+    def summary(self, vectors):
+        labels = self.assign(vectors)
+        vectors = vectors.reindex(columns=self.columns, fill_value=0.0)
+        means = vectors.groupby(labels).mean().reindex(range(self.model.n_clusters))
+        summary = pd.DataFrame({'participants': labels.value_counts().reindex(means.index, fill_value=0)})
+        bartle_columns = [c for c in self.columns if c in BARTLE_MAP]
+        yee_columns = [c for c in self.columns if c not in BARTLE_MAP]
+        #clusters without participants have no dominant motivation
+        filled = means.dropna()
+        summary['yee'] = filled[yee_columns].idxmax(axis=1)
+        summary['bartle'] = filled[bartle_columns].idxmax(axis=1)
+        return pd.concat([summary, means], axis=1)
+
+    def save(self, path=MODEL_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model.to_dict(), "columns": self.columns, "known": sorted(self.known)}, f)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        segments = cls()
+        segments.model = MiniBatchKMeans.from_dict(data["model"])
+        segments.columns = data["columns"]
+        segments.known = set(data["known"])
+        return segments
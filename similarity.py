@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from streaming import iter_chunks, stream_motivation_vectors, CHUNKSIZE
+
+from metrics import metrics
+
+#weights of the user x game matrix
+#hours: playtime hours, log: log(1 + hours), binary: 1 if owned, tfidf: (1 + log(1 + hours)) * idf of the game
+WEIGHTINGS = ["hours", "log", "binary", "tfidf"]
+
+#rows of the similarity computed at a time, a block uses block_size x users floats
+BLOCK_SIZE = 256
+
+#neighbours returned by default
+TOP_K = 10
+
+
+#sparse user x appid matrix of playtime hours, read in chunks
+#returns (csr matrix, users, appids), games owned twice by a user are summed
+def build_ownership_matrix(path=None, chunksize=CHUNKSIZE):
+    users, appids, hours = [], [], []
+    for chunk in iter_chunks(path, chunksize, columns=['participant_id', 'appid', 'playtime_hours']):
+        users.append(chunk['participant_id'].astype(str).to_numpy())
+        appids.append(chunk['appid'].to_numpy(dtype=np.int64))
+        hours.append(chunk['playtime_hours'].fillna(0).to_numpy(dtype=np.float64))
+
+    user_codes, user_index = pd.factorize(np.concatenate(users), sort=True)
+    app_codes, app_index = pd.factorize(np.concatenate(appids), sort=True)
+    matrix = sparse.coo_matrix((np.concatenate(hours), (user_codes, app_codes)),
+                               shape=(len(user_index), len(app_index))).tocsr()
+    matrix.sum_duplicates()
+    return matrix, pd.Index(user_index, name='participant_id'), pd.Index(app_index, name='appid')
+
+
+#applies a weighting of WEIGHTINGS to the hours matrix
+#with binary and tfidf owned games with 0 hours still count, with hours and log only played games do
+def weight_matrix(matrix, weighting="log"):
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"Ponderación desconocida: {weighting} (opciones: {', '.join(WEIGHTINGS)})")
+    matrix = matrix.astype(np.float64, copy=True)
+    if weighting == "hours":
+        return matrix
+    if weighting == "binary":
+        matrix.data = np.ones_like(matrix.data)
+        return matrix
+
+    matrix.data = np.log1p(matrix.data)
+    if weighting == "tfidf":
+        #games in every library say little about the player, rare games say more
+        n_users = matrix.shape[0]
+        owners = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        idf = np.log((1 + n_users) / (1 + owners)) + 1
+        matrix.data = (1 + matrix.data) * idf[matrix.indices]
+    return matrix
+
+
+#rows with unit length, so a dot product is the cosine (empty rows stay empty)
+def normalize_rows(matrix):
+    matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+#top-k cosine similarity between participants
+#library is the weighted user x appid matrix, profiles an optional dataframe of motivation vectors
+#with profile_weight w the similarity is (1 - w) * cosine of the libraries + w * cosine of the profiles
+#the similarity is computed by blocks of rows, the users x users matrix is never built
+class SimilarityIndex:
+    def __init__(self, library, users, profiles=None, profile_weight=0.0):
+        if not 0 <= profile_weight <= 1:
+            raise ValueError(f"El peso de los perfiles debe estar entre 0 y 1: {profile_weight}")
+        self.users = pd.Index(users, name='participant_id')
+        self.positions = {user: i for i, user in enumerate(self.users)}
+        blocks = [normalize_rows(library) * np.sqrt(1 - profile_weight)]
+        if profiles is not None and profile_weight > 0:
+            #share of every motivation, like the radar, aligned with the users of the matrix
+            profiles = profiles.reindex(self.users).fillna(0.0)
+            shares = profiles.div(profiles.sum(axis=1).replace(0, 1), axis=0)
+            blocks.append(normalize_rows(sparse.csr_matrix(shares.to_numpy())) * np.sqrt(profile_weight))
+        self.vectors = sparse.hstack(blocks, format='csr')
+        self.vectors_t = self.vectors.T.tocsr()
+
+    #index from the dataset (tables, parquet or csv)
+    #profiles=True adds the yee and bartle vectors with profile_weight
+    @classmethod
+    def from_dataset(cls, path=None, weighting="log", profiles=False, profile_weight=0.3, chunksize=CHUNKSIZE):
+        matrix, users, _ = build_ownership_matrix(path, chunksize)
+        vectors = None
+        if profiles:
+            yee_df, bartle_df = stream_motivation_vectors(path, chunksize)
+            vectors = pd.concat([yee_df, bartle_df.add_prefix('bartle_')], axis=1)
+        return cls(weight_matrix(matrix, weighting), users, vectors, profile_weight if profiles else 0.0)
+
+    #similarities of a block of rows against every user, the user itself is excluded
+    def _block(self, start, stop):
+        scores = (self.vectors[start:stop] @ self.vectors_t).toarray()
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        return scores
+
+    #k best columns of every row of scores, best first
+    @staticmethod
+    def _top(scores, k):
+        k = min(k, scores.shape[1] - 1)
+        if k <= 0:
+            return np.empty((len(scores), 0), dtype=np.int64)
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(best, order, axis=1)
+
+    #most similar participants to user, as a dataframe neighbour -> similarity
+    def similar(self, user, k=TOP_K):
+        if user not in self.positions:
+            raise KeyError(f"No hay datos de {user}")
+        i = self.positions[user]
+        scores = self._block(i, i + 1)
+        best = self._top(scores, k)[0]
+        return pd.DataFrame({'neighbour': self.users[best], 'similarity': scores[0, best]})
+
+    #top-k neighbours of every participant, by blocks of block_size users
+    #returns a long dataframe participant_id, rank, neighbour, similarity
+    @metrics.timed()
+    def top_k(self, k=TOP_K, block_size=BLOCK_SIZE):
+        parts = []
+        for start in range(0, len(self.users), block_size):
+            stop = min(start + block_size, len(self.users))
+            scores = self._block(start, stop)
+            best = self._top(scores, k)
+            rows = np.repeat(np.arange(start, stop), best.shape[1])
+            parts.append(pd.DataFrame({
+                'participant_id': self.users[rows],
+                'rank': np.tile(np.arange(1, best.shape[1] + 1), stop - start),
+                'neighbour': self.users[best.ravel()],
+                'similarity': np.take_along_axis(scores, best, axis=1).ravel()
+            }))
+        return pd.concat(parts, ignore_index=True)
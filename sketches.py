@@ -0,0 +1,136 @@
+import base64
+import json
+import math
+import random
+
+import numpy as np
+import pandas as pd
+
+
+#kll quantile sketch: keeps about k items per level, mergeable and serializable
+#rank error is around 1.7 / k
+class KLLSketch:
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self.random = random.Random(seed)
+
+    #maximum items of a level, the top level keeps k and lower levels fewer
+    def capacity(self, level):
+        height = len(self.compactors)
+        return max(2, int(math.ceil(self.k * (2 / 3) ** (height - level - 1))))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.compactors[0].extend(values.tolist())
+        self._compress()
+
+    #halves the first level over its capacity and promotes the kept items
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            if len(self.compactors[level]) > self.capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items = sorted(self.compactors[level])
+                #an odd item chosen at random stays in the level (always keeping the largest biases the ranks)
+                keep = [items.pop(self.random.randrange(len(items)))] if len(items) % 2 else []
+                offset = self.random.randint(0, 1)
+                self.compactors[level + 1].extend(items[offset::2])
+                self.compactors[level] = keep
+                level = 0
+                continue
+            level += 1
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self._compress()
+
+    def quantile(self, q):
+        items = [(value, 2 ** level) for level, values in enumerate(self.compactors) for value in values]
+        if not items:
+            return float('nan')
+        items.sort()
+        values = np.array([v for v, _ in items])
+        cumulative = np.cumsum([w for _, w in items])
+        #first item whose cumulative weight reaches the rank
+        index = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(values[min(index, len(values) - 1)])
+
+    def to_dict(self):
+        return {"type": "kll", "k": self.k, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        sketch.compactors = [list(level) for level in data["compactors"]]
+        return sketch
+
+
+#powers of two to get the bit length of 64 bit hashes without floats
+_POWERS = np.array([2 ** i for i in range(64)], dtype=np.uint64)
+
+
+#hyperloglog distinct counter with 2^p registers, mergeable and serializable
+#standard error is around 1.04 / sqrt(2^p) (0.8% with p=14)
+class HyperLogLog:
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(2 ** p, dtype=np.uint8)
+
+    #values are hashed with pandas (fixed key), so shards hash the same way
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        if not len(values):
+            return
+        #same hash for an id stored as int32 or int64
+        if pd.api.types.is_integer_dtype(values):
+            values = values.astype('int64')
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        #position of the first 1 bit in the remaining 64 - p bits
+        rank = (64 - self.p) - np.searchsorted(_POWERS, rest, side='right') + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("HyperLogLog con distinta precisión")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = int((self.registers == 0).sum())
+        #small range correction (linear counting)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self):
+        return {"type": "hll", "p": self.p, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["p"])
+        sketch.registers = np.frombuffer(base64.b64decode(data["registers"]), dtype=np.uint8).copy()
+        return sketch
+
+
+#json text of a dictionary of sketches
+def dumps(sketches):
+    return json.dumps({name: sketch.to_dict() for name, sketch in sketches.items()})
+
+
+def loads(text):
+    types = {"kll": KLLSketch, "hll": HyperLogLog}
+    return {name: types[data["type"]].from_dict(data) for name, data in json.loads(text).items()}
@@ -1,11 +1,42 @@
-import requests
 from config import STEAM_API_KEY
+import os
 import time
 
+from rate_limiter import TokenBucket
+
+from http_client import HttpClient, backoff_seconds
+
+from cache import get_default_cache, MISSING, METADATA_TTL
+
+from metrics import metrics
+
+#base urls, can be changed to use a local server (see mock_server.py)
+STEAM_API_URL = os.environ.get("STEAM_API_URL", "http://api.steampowered.com")
+STORE_API_URL = os.environ.get("STORE_API_URL", "https://store.steampowered.com")
+
+#requests per second and burst size for each endpoint
+#store appdetails allows around 200 calls every 5 minutes
+RATE_LIMITS = {
+    "IPlayerService": (4.0, 4),
+    "ISteamUserStats": (10.0, 10),
+    "appdetails": (0.6, 1)
+}
+
+#one shared limiter per endpoint, used instead of fixed sleeps
+limiters = {endpoint: TokenBucket(rate, capacity) for endpoint, (rate, capacity) in RATE_LIMITS.items()}
+
+#pooled keep-alive session with timeouts, retries with backoff and circuit breakers
+client = HttpClient(limiters)
+
+#steam sometimes answers 200 with an empty library that is there on the next call,
+#the http client does not see it as an error so it is asked again these times (private profiles are always empty)
+EMPTY_LIBRARY_RETRIES = 2
+
 #principal function
+@metrics.timed()
 def get_owned_games(steam_id):
     #steam api endpoint
-    url = "http://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
+    url = f"{STEAM_API_URL}/IPlayerService/GetOwnedGames/v0001/"
     #dictionary with parameters we need from API
     params = {
         "key": STEAM_API_KEY,
@@ -15,11 +46,17 @@ def get_owned_games(steam_id):
         "format": "json"
     }
     try:
-        #get
-        response = requests.get(url, params=params)
-        #as json
-        data = response.json()
-        return data.get('response', {}).get('games', [])
+        for attempt in range(EMPTY_LIBRARY_RETRIES + 1):
+            #get
+            response = client.get("IPlayerService", url, params=params)
+            #as json
+            data = response.json()
+            games = data.get('response', {}).get('games', [])
+            #errors were already retried by the client, only an empty 200 is asked again
+            if games or response.status_code != 200 or attempt == EMPTY_LIBRARY_RETRIES:
+                return games
+            metrics.count("steam.empty_library_retries")
+            time.sleep(backoff_seconds(attempt))
     
     #exception handling
     except Exception as e:
@@ -27,44 +64,69 @@ def get_owned_games(steam_id):
         return []
 
 
-#sometimes steam api does not send the information in the first try
-#so maybe its necessary to make multiple calls for each user
-def get_owned_games_with_retry(steam_id, retries=3, delay=2):
-    for attempt in range(retries):
-        #using the function from before
-        games = get_owned_games(steam_id)
-        if games:  #if the call gets games, it return them directly
-            return games
-        print(f"Intento {attempt+1} fallido") #attempts control in errors
-        #some error might happen because of private profiles settings on steam
-        time.sleep(delay) #delay to avoid api problems
-
-    #after the specified number of retries there are not games
-    #prints error and empty list
-    print(f"Error en obtención tras {retries} intentos.") 
-    return []
-
-
 #to obtain each game metadata
-def get_game_metadata(appid):
+#store metadata almost never changes, so answers are kept in the persistent cache
+@metrics.timed()
+def get_game_metadata(appid, cache=None):
+    cache = cache or get_default_cache()
+    key = f"appdetails:{appid}"
+    cached = cache.get(key)
+    if cached is not MISSING:
+        return cached
+
     #endpoint for game information 
-    url = f"https://store.steampowered.com/api/appdetails?appids={appid}"
+    url = f"{STORE_API_URL}/api/appdetails"
     
     #api response handling
-    response = requests.get(url)
+    try:
+        response = client.get("appdetails", url, params={"appids": appid})
+    except Exception as e:
+        print(f"Error en metadatos de {appid}: {e}")
+        return None
     if response.status_code == 200:
         #converts to json
         data = response.json()
-        if data[str(appid)]['success']: #verifies if success
-            return data[str(appid)]['data']
+        meta = data[str(appid)]['data'] if data[str(appid)]['success'] else None #verifies if success
+        #games without store page are also cached to avoid asking again
+        cache.set(key, meta, METADATA_TTL)
+        return meta
     return None
 
 
-#to get game achievement ratio [0, 1]
-#achievements privacy settings may differ in users, not returning achievemnts information
-def get_achievement_ratio(steam_id, appid):
+#number of achievements of a game from its schema, the same for every user
+#games with 0 achievements are cached so no user is asked for them again
+@metrics.timed()
+def get_achievement_count(appid, cache=None):
+    cache = cache or get_default_cache()
+    key = f"schema:{appid}"
+    cached = cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    url = f"{STEAM_API_URL}/ISteamUserStats/GetSchemaForGame/v2/"
+    params = {
+        "key": STEAM_API_KEY,
+        "appid": appid
+    }
+    try:
+        resp = client.get("ISteamUserStats", url, params=params)
+    except Exception:
+        return None
+    #unknown, the caller falls back to asking the user
+    if resp.status_code != 200:
+        return None
+    stats = resp.json().get("game", {}).get("availableGameStats", {})
+    count = len(stats.get("achievements", []))
+    cache.set(key, count, METADATA_TTL)
+    return count
+
+
+#achievements of a user for a game
+#returns (status, ratio) with status "ok", "private" (profile not public), "none" or "error"
+@metrics.timed()
+def get_player_achievements(steam_id, appid):
     #
-    url = "http://api.steampowered.com/ISteamUserStats/GetPlayerAchievements/v0001/"
+    url = f"{STEAM_API_URL}/ISteamUserStats/GetPlayerAchievements/v0001/"
     params = {
         "key": STEAM_API_KEY,
         "steamid": steam_id,
@@ -72,17 +134,30 @@ def get_achievement_ratio(steam_id, appid):
         "l": "english"
     }
     #response control
-    resp = requests.get(url, params=params)
+    try:
+        resp = client.get("ISteamUserStats", url, params=params)
+    except Exception:
+        return "error", None
+    try:
+        data = resp.json().get("playerstats", {})
+    except ValueError:
+        data = {}
+    #private profiles answer 403 or an error message
+    if resp.status_code == 403 or "not public" in str(data.get("error", "")).lower():
+        return "private", None
     if resp.status_code != 200:
-        return None
+        return "error", None
     #get statistics
-    data = resp.json().get("playerstats", {})
     achs = data.get("achievements")
     if not achs:
-        return None
+        return "none", None
     #counts number of achievements and number of achieved (+1)
     total = len(achs)
     unlocked = sum(a.get("achieved", 0) for a in achs)
-    if total == 0:
-        return None
-    return unlocked / total #ratio calculus
+    return "ok", unlocked / total #ratio calculus
+
+
+#to get game achievement ratio [0, 1]
+#achievements privacy settings may differ in users, not returning achievemnts information
+def get_achievement_ratio(steam_id, appid):
+    return get_player_achievements(steam_id, appid)[1]
@@ -0,0 +1,234 @@
+import ast
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from tags import TagColumn
+
+#folder with the normalized tables used by the analysis scripts, the csv is kept as export format
+DATA_PATH = "data/steam_data"
+#single wide parquet file of previous versions, still readable
+WIDE_PATH = "data/steam_data.parquet"
+CSV_PATH = "data/steam_data.csv"
+
+#tables of the normalized dataset, joined by appid:
+#ownership has one row per owned game, apps and hltb one row per game
+TABLES = ['ownership', 'apps', 'hltb']
+APP_COLUMNS = ['name_y', 'type', 'genres', 'categories', 'release_date', 'developer', 'publisher']
+HLTB_COLUMNS = ['name', 'hltb_main_story', 'hltb_main_extra', 'hltb_completionist']
+
+#columns with lists of tags
+LIST_COLUMNS = ['genres', 'categories']
+
+#text columns with few distinct values
+CATEGORY_COLUMNS = ['participant_id', 'type']
+
+#unix timestamps, kept as int64 (int32 overflows in 2038)
+TIMESTAMP_COLUMNS = ['rtime_last_played']
+
+
+#converts a cell into a python list (csv cells are list strings, parquet cells are arrays)
+def to_list(value):
+    if isinstance(value, list):
+        return value
+    if isinstance(value, (tuple, np.ndarray)):
+        return list(value)
+    if isinstance(value, str):
+        if not value:
+            return []
+        try:
+            parsed = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return [value]
+        return list(parsed) if isinstance(parsed, (list, tuple)) else [str(parsed)]
+    return []
+
+
+#categorical ids and smaller integer types (list columns are built by the readers)
+#float columns stay float64 so sums and ratios do not change
+def optimize_dtypes(df):
+    df = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in df.select_dtypes(include='integer').columns:
+        if col not in TIMESTAMP_COLUMNS:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+#list columns of csv cells (strings or lists) as lists of interned tags
+#rows with the same tags share one list (see TagColumn.to_lists)
+def share_tag_lists(df):
+    for col in LIST_COLUMNS:
+        if col in df.columns:
+            df[col] = TagColumn.from_series(df[col].map(to_list)).to_lists()
+    return df
+
+
+#pyarrow table or record batch as a dataframe
+#the list columns are decoded from the arrow offsets and values, without a python list per row
+def arrow_to_frame(data):
+    tags = {col: TagColumn.from_arrow(data.column(col)) for col in LIST_COLUMNS if col in data.schema.names}
+    df = data.select([name for name in data.schema.names if name not in tags]).to_pandas()
+    for col, column in tags.items():
+        df[col] = column.to_lists()
+    return df[data.schema.names]
+
+
+#path of the dataset to read: the normalized tables, the wide parquet file or the csv
+def dataset_path():
+    for path in (DATA_PATH, WIDE_PATH):
+        if os.path.exists(path):
+            return path
+    return CSV_PATH
+
+
+#splits the wide dataset into the ownership, apps and hltb tables
+#metadata and hltb data are the same in every row of a game, so one row per appid is kept
+def split_tables(df):
+    app_columns = [c for c in APP_COLUMNS if c in df.columns]
+    hltb_columns = [c for c in HLTB_COLUMNS if c in df.columns]
+    ownership = df.drop(columns=app_columns + hltb_columns)
+    apps = df[['appid'] + app_columns].drop_duplicates(subset=['appid'])
+    hltb = df[['appid'] + hltb_columns].drop_duplicates(subset=['appid'])
+    #games not found in howlongtobeat have no row
+    hltb = hltb[hltb[hltb_columns].notna().any(axis=1)]
+    return ownership, apps, hltb
+
+
+#normalized dataset in a folder, with the wide rows built lazily by joining on appid
+#apps and hltb have one row per game, so they are read once and kept in memory
+class TableDataset:
+    def __init__(self, path=DATA_PATH):
+        self.path = path
+        self.cache = {}
+        self.schemas = {}
+
+    def table_path(self, name):
+        return os.path.join(self.path, f"{name}.parquet")
+
+    #columns of every table as stored, read once
+    def schema(self, name):
+        import pyarrow.parquet as pq
+        if name not in self.schemas:
+            self.schemas[name] = pq.read_schema(self.table_path(name)).names
+        return self.schemas[name]
+
+    #wide columns in the order of the original dataset (ownership, apps, hltb)
+    def columns(self):
+        return [c for name in TABLES for c in self.schema(name) if name == 'ownership' or c != 'appid']
+
+    def table(self, name):
+        import pyarrow.parquet as pq
+        if name not in self.cache:
+            self.cache[name] = arrow_to_frame(pq.read_table(self.table_path(name)))
+        return self.cache[name]
+
+    #adds the app and hltb columns to a part of the ownership table
+    def join(self, ownership, columns=None):
+        df = ownership
+        for name in TABLES[1:]:
+            wanted = [c for c in self.schema(name) if c != 'appid' and (columns is None or c in columns)]
+            if wanted:
+                df = df.merge(self.table(name)[['appid'] + wanted], on='appid', how='left')
+        return df
+
+    #ownership columns to read for the given wide columns (appid is always needed for the join)
+    def ownership_columns(self, columns=None):
+        if columns is None:
+            return None
+        return [c for c in self.schema('ownership') if c in columns or c == 'appid']
+
+    #columns in the requested order, appid removed if it was only read for the join
+    def select(self, df, columns=None):
+        if columns is None:
+            return df
+        return df[[c for c in columns if c in df.columns]]
+
+    #the whole wide dataframe
+    def to_frame(self, columns=None):
+        ownership = pd.read_parquet(self.table_path('ownership'), columns=self.ownership_columns(columns))
+        return self.select(self.join(ownership, columns), columns)
+
+    #parts of chunksize rows of the ownership table
+    def iter_ownership(self, chunksize, columns=None):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(self.table_path('ownership'))
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=self.ownership_columns(columns)):
+            yield batch.to_pandas()
+
+    #wide dataframes of chunksize ownership rows
+    def iter_batches(self, chunksize, columns=None):
+        for ownership in self.iter_ownership(chunksize, columns):
+            yield self.select(self.join(ownership, columns), columns)
+
+    #like iter_batches but the list columns come as TagColumn codes, taken from the tags of every game
+    #yields (chunk without the list columns, {column: TagColumn})
+    def iter_tagged_batches(self, chunksize, columns=None):
+        if columns is None:
+            columns = self.columns()
+        list_columns = [c for c in LIST_COLUMNS if c in columns and c in self.schema('apps')]
+        others = [c for c in columns if c not in list_columns]
+        apps = self.table('apps')
+        app_tags = {col: TagColumn.from_series(apps[col]) for col in list_columns}
+        positions = pd.Index(apps['appid'])
+        for ownership in self.iter_ownership(chunksize, others):
+            #games without metadata (-1) have no tags
+            rows = positions.get_indexer(ownership['appid'])
+            tags = {col: app_tags[col].take(rows) for col in list_columns}
+            yield self.select(self.join(ownership, others), others), tags
+
+
+#saves the dataset as normalized tables (a folder), a wide parquet file or csv, depending on the path
+#the tables are written in a temporary folder that replaces the old one at the end,
+#so an interrupted save never leaves tables of different runs together
+def save_dataset(df, path=DATA_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if path.endswith('.csv'):
+        df.to_csv(path, index=False)
+    elif path.endswith('.parquet'):
+        optimize_dtypes(df).to_parquet(path, index=False)
+    else:
+        path = path.rstrip('/\\')
+        tmp_path, old_path = path + ".tmp", path + ".old"
+        #a save stopped between the two renames only left the old folder
+        if os.path.exists(old_path) and not os.path.exists(path):
+            os.rename(old_path, path)
+        for leftover in (tmp_path, old_path):
+            if os.path.exists(leftover):
+                shutil.rmtree(leftover)
+        os.makedirs(tmp_path)
+        for name, table in zip(TABLES, split_tables(df)):
+            optimize_dtypes(table).to_parquet(os.path.join(tmp_path, f"{name}.parquet"), index=False)
+        #a folder cannot be replaced in one step, the old one is moved aside first
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+
+
+#loads the dataset with genres and categories already as lists
+#uses the normalized tables or the parquet file if they exist, otherwise parses the csv once
+def load_dataset(path=None):
+    if path is None:
+        path = dataset_path()
+    if path.endswith('.csv'):
+        df = share_tag_lists(pd.read_csv(path, converters={col: to_list for col in LIST_COLUMNS}))
+    elif os.path.isdir(path):
+        df = TableDataset(path).to_frame()
+    else:
+        import pyarrow.parquet as pq
+        df = arrow_to_frame(pq.read_table(path))
+    return optimize_dtypes(df)
+
+
+#converts the csv (or the wide parquet file) into the normalized tables
+if __name__ == "__main__":
+    source = WIDE_PATH if os.path.exists(WIDE_PATH) else CSV_PATH
+    save_dataset(load_dataset(source), DATA_PATH)
+    print(f"Datos guardados en {DATA_PATH}")
@@ -0,0 +1,346 @@
+import math
+import os
+import random
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from storage import to_list, optimize_dtypes, share_tag_lists, arrow_to_frame, dataset_path, TableDataset, LIST_COLUMNS
+
+from sketches import KLLSketch, HyperLogLog
+
+from tags import TagColumn, TAGS
+
+#rows read at a time
+CHUNKSIZE = 100000
+
+#maximum number of points kept for the hltb scatter plots
+SAMPLE_SIZE = 50000
+
+
+#reads the dataset in chunks (row batches of the tables or the parquet file, or csv chunks) with list columns parsed
+#with the normalized tables every chunk of ownership rows is joined with the games it contains
+def iter_chunks(path=None, chunksize=CHUNKSIZE, columns=None):
+    if path is None:
+        path = dataset_path()
+    if os.path.isdir(path):
+        for chunk in TableDataset(path).iter_batches(chunksize, columns):
+            yield optimize_dtypes(chunk)
+    elif path.endswith('.csv'):
+        converters = {col: to_list for col in LIST_COLUMNS if columns is None or col in columns}
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns, converters=converters):
+            yield optimize_dtypes(share_tag_lists(chunk))
+    else:
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield optimize_dtypes(arrow_to_frame(batch))
+
+
+#like iter_chunks but genres and categories come as TagColumn codes instead of lists
+#yields (chunk without the list columns, {column: TagColumn})
+#with parquet the python lists are never built, with the tables the tags of each game are read once
+def iter_tagged_chunks(path=None, chunksize=CHUNKSIZE, columns=None):
+    if path is None:
+        path = dataset_path()
+    if os.path.isdir(path):
+        for chunk, tags in TableDataset(path).iter_tagged_batches(chunksize, columns):
+            yield optimize_dtypes(chunk), tags
+    elif path.endswith('.csv'):
+        for chunk in iter_chunks(path, chunksize, columns):
+            tags = {col: TagColumn.from_series(chunk[col]) for col in LIST_COLUMNS if col in chunk.columns}
+            yield chunk.drop(columns=list(tags)), tags
+    else:
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            tags = {col: TagColumn.from_arrow(batch.column(col)) for col in LIST_COLUMNS if col in batch.schema.names}
+            others = [name for name in batch.schema.names if name not in tags]
+            yield optimize_dtypes(batch.select(others).to_pandas()), tags
+
+
+#raised when none of the requested participants are in the dataset
+class NoParticipantsError(ValueError):
+    pass
+
+
+#yields (participant_id, dataframe) with all the rows of one participant at a time
+#the dataset must have the rows of each participant together (as main.py saves it),
+#a participant that appears again after other rows raises ValueError instead of giving split groups
+def iter_user_groups(chunks):
+    pending = None
+    finished = set()
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        chunk = chunk.assign(participant_id=chunk['participant_id'].astype(str))
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        ids = chunk['participant_id']
+        #first participant of every run of consecutive rows, each one must be new
+        runs = ids[ids.ne(ids.shift())]
+        repeated = runs[runs.duplicated() | runs.isin(finished)]
+        if len(repeated):
+            raise ValueError(f"Los datos no están agrupados por participante ({repeated.iloc[0]})")
+        #the last participant of the chunk may continue in the next one
+        last = ids.iloc[-1]
+        pending = chunk[ids == last]
+        for user, group in chunk[ids != last].groupby('participant_id', sort=False):
+            finished.add(user)
+            yield user, group
+    if pending is not None:
+        yield pending['participant_id'].iloc[0], pending
+
+
+#count, mean and sum of squared differences, mergeable (Chan et al.)
+class RunningMoments:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            other = RunningMoments()
+            other.count = len(values)
+            other.mean = float(values.mean())
+            other.m2 = float(((values - other.mean) ** 2).sum())
+            self.merge(other)
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count == 0:
+            return
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+
+    #sample standard deviation (ddof=1, as pandas)
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float('nan')
+
+
+#exact quantiles from a histogram of values
+#playtime hours are rounded to 0.1 h, so the number of distinct values stays small
+class ValueHistogram:
+    def __init__(self):
+        self.counts = Counter()
+
+    def update(self, values):
+        self.counts.update(pd.Series(values).dropna().value_counts().to_dict())
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+
+    #linear interpolation between closest ranks, as pandas quantile
+    def quantile(self, q):
+        values = np.array(sorted(self.counts))
+        if not len(values):
+            return float('nan')
+        cumulative = np.cumsum([self.counts[v] for v in values])
+        position = q * (cumulative[-1] - 1)
+        lower = math.floor(position)
+        #value at a 0 based rank
+        at = lambda rank: values[np.searchsorted(cumulative, rank, side='right')]
+        low_value = at(lower)
+        if position == lower:
+            return float(low_value)
+        return float(low_value + (position - lower) * (at(lower + 1) - low_value))
+
+
+#uniform sample of rows, mergeable
+class Reservoir:
+    def __init__(self, size=SAMPLE_SIZE, seed=0):
+        self.size = size
+        self.seen = 0
+        self.items = []
+        self.random = random.Random(seed)
+
+    def update(self, rows):
+        for row in rows:
+            self.seen += 1
+            if len(self.items) < self.size:
+                self.items.append(row)
+            else:
+                j = self.random.randrange(self.seen)
+                if j < self.size:
+                    self.items[j] = row
+
+    def merge(self, other):
+        seen = self.seen + other.seen
+        if len(self.items) + len(other.items) > self.size:
+            #each side contributes in proportion to the rows it has seen
+            take = round(self.size * self.seen / seen) if seen else 0
+            take = min(take, len(self.items), self.size)
+            rest = min(self.size - take, len(other.items))
+            self.items = self.random.sample(self.items, take) + self.random.sample(other.items, rest)
+        else:
+            self.items = self.items + other.items
+        self.seen = seen
+
+
+#adds the hours of a tag column (genres or categories) to a counter
+def add_tag_hours(counter, tag_column, hours):
+    rows, codes = tag_column.explode()
+    hours = np.nan_to_num(np.asarray(hours, dtype=float))
+    sums = np.bincount(codes, weights=hours[rows], minlength=len(TAGS))
+    #every tag that appears, even with 0 hours
+    present = np.flatnonzero(np.bincount(codes, minlength=len(TAGS)))
+    counter.update(dict(zip(TAGS.decode(present), sums[present].tolist())))
+
+
+#running aggregates for eda.py, updated chunk by chunk and mergeable between shards
+#with approximate=True unique games use hyperloglog and percentiles use a kll sketch
+class EdaAggregates:
+    def __init__(self, sample_size=SAMPLE_SIZE, approximate=False):
+        self.approximate = approximate
+        self.rows = 0
+        #hours by genre, category and game
+        self.genre_hours = Counter()
+        self.category_hours = Counter()
+        self.game_hours = Counter()
+        #unique games and participants
+        self.appids = HyperLogLog() if approximate else set()
+        self.played_appids = HyperLogLog() if approximate else set()
+        self.participants = set()
+        #playtime of all games and of played games
+        self.playtime = RunningMoments()
+        self.played = RunningMoments()
+        self.played_values = KLLSketch() if approximate else ValueHistogram()
+        self.zero_hours = 0
+        #games without genre or category
+        self.no_genre = 0
+        self.no_category = 0
+        #(participant_id, hltb_main_story, playtime_hours) for the scatter plots
+        self.hltb_points = Reservoir(sample_size)
+
+    #tags is an optional {column: TagColumn}, otherwise the list columns of the chunk are used
+    def update(self, chunk, tags=None):
+        if tags is None:
+            tags = {col: TagColumn.from_series(chunk[col]) for col in ('genres', 'categories')}
+        hours = chunk['playtime_hours']
+        played = chunk[hours > 0]
+
+        self.rows += len(chunk)
+        add_tag_hours(self.genre_hours, tags['genres'], hours)
+        add_tag_hours(self.category_hours, tags['categories'], hours)
+        self.game_hours.update(chunk.groupby('name_x')['playtime_hours'].sum().to_dict())
+
+        self.appids.update(chunk['appid'].unique())
+        self.played_appids.update(played['appid'].unique())
+        self.participants.update(chunk['participant_id'].dropna().astype(str).unique().tolist())
+
+        self.playtime.update(hours)
+        self.played.update(played['playtime_hours'])
+        self.played_values.update(played['playtime_hours'])
+        self.zero_hours += int((hours == 0).sum())
+
+        self.no_genre += int((tags['genres'].lengths() == 0).sum())
+        self.no_category += int((tags['categories'].lengths() == 0).sum())
+
+        hltb = chunk[chunk['hltb_main_story'].notna() & (chunk['hltb_main_story'] > 0)]
+        self.hltb_points.update(zip(hltb['participant_id'].astype(str), hltb['hltb_main_story'], hltb['playtime_hours']))
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.genre_hours.update(other.genre_hours)
+        self.category_hours.update(other.category_hours)
+        self.game_hours.update(other.game_hours)
+        if self.approximate:
+            self.appids.merge(other.appids)
+            self.played_appids.merge(other.played_appids)
+        else:
+            self.appids |= other.appids
+            self.played_appids |= other.played_appids
+        self.participants |= other.participants
+        self.playtime.merge(other.playtime)
+        self.played.merge(other.played)
+        self.played_values.merge(other.played_values)
+        self.zero_hours += other.zero_hours
+        self.no_genre += other.no_genre
+        self.no_category += other.no_category
+        self.hltb_points.merge(other.hltb_points)
+
+    #number of unique games, of unique played games and of unique games never played
+    def unique_games(self):
+        return self.appids.count() if self.approximate else len(self.appids)
+
+    def unique_played_games(self):
+        return self.played_appids.count() if self.approximate else len(self.played_appids)
+
+    def unique_unplayed_games(self):
+        #played games are a subset of all games
+        if self.approximate:
+            return max(0, self.unique_games() - self.unique_played_games())
+        return len(self.appids - self.played_appids)
+
+    def quantile(self, q):
+        return self.played_values.quantile(q)
+
+    #TOP n of a counter of hours as a series, like groupby().sum().sort_values().head()
+    @staticmethod
+    def top(counter, n=10):
+        return pd.Series(counter, dtype=float).sort_index().sort_values(ascending=False).head(n)
+
+    def hltb_sample(self):
+        return pd.DataFrame(self.hltb_points.items, columns=['participant_id', 'hltb_main_story', 'playtime_hours']) \
+            .sort_values(by='participant_id', kind='stable')
+
+
+#runs the eda aggregates over the whole dataset with bounded memory
+def stream_eda(path=None, chunksize=CHUNKSIZE, approximate=False):
+    columns = ['appid', 'name_x', 'participant_id', 'playtime_hours', 'genres', 'categories', 'hltb_main_story']
+    aggregates = EdaAggregates(approximate=approximate)
+    for chunk, tags in iter_tagged_chunks(path, chunksize, columns):
+        aggregates.update(chunk, tags)
+    return aggregates
+
+
+#profiles, user stats and unique tags one participant at a time, with bounded memory
+#returns yee_df, bartle_df, stats, genres and categories
+#users limits the participants computed (all of them if None), NoParticipantsError if none of them has rows
+def stream_profiles(path=None, chunksize=CHUNKSIZE, users=None):
+    from profiles import compute_profiles, compute_user_stats
+
+    yee_parts, bartle_parts, stats_parts = [], [], []
+    all_genres, all_categories = set(), set()
+    for user, user_df in iter_user_groups(iter_chunks(path, chunksize)):
+        if users is not None and user not in users:
+            continue
+        yee, bartle = compute_profiles(user_df)
+        yee_parts.append(yee)
+        bartle_parts.append(bartle)
+        stats_parts.append(compute_user_stats(user_df))
+        for genres in user_df['genres']:
+            all_genres.update(genres)
+        for categories in user_df['categories']:
+            all_categories.update(categories)
+
+    if not yee_parts:
+        raise NoParticipantsError(f"No hay datos de los participantes {sorted(users) if users else ''}")
+
+    #same order as a groupby over the whole dataset
+    yee_df = pd.concat(yee_parts).sort_index()
+    bartle_df = pd.concat(bartle_parts).sort_index()
+    stats = pd.concat(stats_parts).sort_index()
+    return yee_df, bartle_df, stats, all_genres, all_categories
+
+
+#yee and bartle points of every participant, computed chunk by chunk
+#the points are sums by participant, so partial sums of the chunks can be added
+def stream_motivation_vectors(path=None, chunksize=CHUNKSIZE):
+    from profiles import compute_profiles
+
+    columns = ['participant_id', 'playtime_hours', 'achievement_ratio', 'genres', 'categories']
+    yee_parts, bartle_parts = [], []
+    for chunk in iter_chunks(path, chunksize, columns):
+        yee, bartle = compute_profiles(chunk)
+        yee_parts.append(yee)
+        bartle_parts.append(bartle)
+    yee_df = pd.concat(yee_parts).groupby(level=0).sum()
+    bartle_df = pd.concat(bartle_parts).groupby(level=0).sum()
+    yee_df.index = yee_df.index.astype(str)
+    bartle_df.index = bartle_df.index.astype(str)
+    return yee_df, bartle_df
@@ -0,0 +1,70 @@
+from collections import deque
+
+import numpy as np
+
+
+#keyword matcher compiled once from a motivation map (motive -> keywords)
+#a tag matches a motive if it contains any of its keywords, like kw in tag
+#uses an aho-corasick automaton, so the cost of a tag does not depend on the number of keywords,
+#and remembers the result of every tag already seen
+class MotiveMatcher:
+    def __init__(self, map_dict):
+        self.motives = list(map_dict.keys())
+        #automaton states: transitions, failure link and motives found at the state
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+        for j, keywords in enumerate(map_dict.values()):
+            for kw in keywords:
+                self._add(kw.strip().lower(), j)
+        self._build_links()
+        #tag -> boolean row with one value per motive
+        self.memo = {}
+
+    def _add(self, keyword, motive):
+        state = 0
+        for char in keyword:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(set())
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].add(motive)
+
+    #breadth first, each state inherits the motives of its failure state
+    #states at depth 1 keep the root as failure state
+    def _build_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and char not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(char, 0)
+                self.output[nxt] |= self.output[self.fail[nxt]]
+
+    #boolean array with the motives found in the tag
+    def match(self, tag):
+        tag = tag.strip().lower()
+        if tag in self.memo:
+            return self.memo[tag]
+        found = set(self.output[0])
+        state = 0
+        for char in tag:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            found |= self.output[state]
+        row = np.zeros(len(self.motives), dtype=bool)
+        row[list(found)] = True
+        self.memo[tag] = row
+        return row
+
+    #incidence matrix tag x motive for a vocabulary of tags
+    def incidence(self, vocab):
+        if not len(vocab):
+            return np.zeros((0, len(self.motives)), dtype=bool)
+        return np.vstack([self.match(tag) for tag in vocab])
@@ -0,0 +1,140 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+#every genre and category string stored once, identified by an integer code
+class TagDictionary:
+    def __init__(self):
+        self.codes = {}
+        self.tags = []
+
+    def __len__(self):
+        return len(self.tags)
+
+    #code of a tag, added if it is new
+    def intern(self, tag):
+        code = self.codes.get(tag)
+        if code is None:
+            code = len(self.tags)
+            self.codes[tag] = code
+            self.tags.append(tag)
+        return code
+
+    #the shared string object of a tag (so equal tags use the same memory)
+    def canonical(self, tag):
+        return self.tags[self.intern(tag)]
+
+    #codes of a sequence of tags, only the unique values go through the dictionary
+    def encode(self, values):
+        if not len(values):
+            return np.array([], dtype=np.int32)
+        inverse, uniques = pd.factorize(np.asarray(values, dtype=object))
+        return np.array([self.intern(tag) for tag in uniques], dtype=np.int32)[inverse]
+
+    def decode(self, codes):
+        return [self.tags[code] for code in codes]
+
+
+#dictionary shared by the whole library (genres and categories)
+TAGS = TagDictionary()
+
+
+#list column stored as integer codes in csr format:
+#the tags of row i are codes[offsets[i]:offsets[i + 1]]
+class TagColumn:
+    def __init__(self, offsets, codes, dictionary=TAGS):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.dictionary = dictionary
+
+    #from a series of lists (empty or missing cells are rows without tags)
+    #rows pointing to the same list object (the rows of a game, see to_lists) are encoded once
+    @classmethod
+    def from_series(cls, series, dictionary=TAGS):
+        values = list(series)
+        rows, _ = pd.factorize(np.fromiter(map(id, values), dtype=np.int64, count=len(values)))
+        first = np.unique(rows, return_index=True)[1]
+        lists = [values[i] if isinstance(values[i], (list, tuple, np.ndarray)) else [] for i in first]
+        lengths = np.fromiter((len(value) for value in lists), dtype=np.int64, count=len(lists))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        codes = dictionary.encode(list(itertools.chain.from_iterable(lists)))
+        column = cls(offsets, codes, dictionary)
+        return column if len(lists) == len(values) else column.take(rows)
+
+    #from a pyarrow list column (parquet), without building python lists
+    @classmethod
+    def from_arrow(cls, array, dictionary=TAGS):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        lengths = pc.fill_null(pc.list_value_length(array), 0).to_numpy(zero_copy_only=False)
+        offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        encoded = pc.dictionary_encode(array.flatten())
+        if isinstance(encoded, pa.ChunkedArray):
+            encoded = encoded.combine_chunks()
+        #codes of the chunk dictionary translated to the shared dictionary
+        mapping = np.array([dictionary.intern(tag) for tag in encoded.dictionary.to_pylist()], dtype=np.int32)
+        local = encoded.indices.to_numpy(zero_copy_only=False)
+        return cls(offsets, mapping[local] if len(local) else np.array([], dtype=np.int32), dictionary)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.codes.nbytes
+
+    #number of tags of every row
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    #row of every code, the same as the index of pandas explode
+    def row_ids(self):
+        return np.repeat(np.arange(len(self)), self.lengths())
+
+    #(row, code) pairs of every tag
+    def explode(self):
+        return self.row_ids(), self.codes
+
+    #True for the rows that have the tag
+    def contains(self, tag):
+        code = self.dictionary.codes.get(tag)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return np.bincount(self.row_ids()[self.codes == code], minlength=len(self)) > 0
+
+    #column with the given rows, in that order (-1 gives a row without tags)
+    #used to expand the tags of every game to the rows that own it
+    def take(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(self):
+            return TagColumn(np.zeros(len(rows) + 1, dtype=np.int64), [], self.dictionary)
+        lengths = np.where(rows >= 0, self.lengths()[rows], 0)
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        #position of every output code in self.codes
+        index = np.repeat(self.offsets[:-1][rows] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return TagColumn(offsets, self.codes[index], self.dictionary)
+
+    #tags of a row
+    def row(self, i):
+        return self.dictionary.decode(self.codes[self.offsets[i]:self.offsets[i + 1]])
+
+    #back to a list per row, every list pointing to the shared tag strings
+    #rows with the same tags share one list object, so a row costs a pointer instead of a list
+    #(the lists must not be modified in place)
+    def to_lists(self):
+        tags = self.dictionary.tags
+        codes = self.codes.tolist()
+        shared = {}
+        lists = np.empty(len(self), dtype=object)
+        for i, (start, end) in enumerate(zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist())):
+            key = tuple(codes[start:end])
+            value = shared.get(key)
+            if value is None:
+                value = shared[key] = [tags[code] for code in key]
+            lists[i] = value
+        return lists
@@ -0,0 +1,45 @@
+import pytest
+
+from cache import ResponseCache
+from hltb import HLTBEngine, normalize_title
+
+
+#titles with edition words that are part of the name
+@pytest.mark.parametrize("name, title", [
+    ("Ultimate Chicken Horse", "ultimate chicken horse"),
+    ("Gold Rush: The Game", "gold rush the game"),
+    ("Persona 5 Royal", "persona 5 royal"),
+    ("Standard Bearer", "standard bearer"),
+    ("Digital Combat Simulator World", "digital combat simulator world"),
+    ("Deluxe", "deluxe"),
+])
+def test_edition_words_inside_the_title_are_kept(name, title):
+    assert normalize_title(name) == title
+
+
+#edition suffixes, trademarks and accents
+@pytest.mark.parametrize("name, title", [
+    ("The Elder Scrolls V: Skyrim Special Edition", "the elder scrolls v skyrim"),
+    ("The Witcher® 3: Wild Hunt - Game of the Year Edition", "the witcher 3 wild hunt"),
+    ("Dark Souls: Remastered", "dark souls"),
+    ("DEATH STRANDING DIRECTOR'S CUT", "death stranding"),
+    ("Half-Life 2 (GOTY)", "half life 2"),
+    ("Pokémon™ Edition", "pokemon"),
+])
+def test_edition_suffixes_are_removed(name, title):
+    assert normalize_title(name) == title
+
+
+#editions of a game resolve from the same cached search in a later run
+def test_editions_share_the_cached_search(tmp_path):
+    searched = []
+
+    def search(title):
+        searched.append(title)
+        return {"name": "Hades", "hltb_main_story": 22.0, "hltb_main_extra": 48.0, "hltb_completionist": 95.0}
+
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    HLTBEngine(cache, search=search).lookup({1: "Hades"})
+    results = HLTBEngine(cache, search=search).lookup({2: "Hades - Deluxe Edition"})
+    assert searched == ["hades"]
+    assert results[2]["hltb_main_story"] == 22.0
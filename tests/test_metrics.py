@@ -0,0 +1,24 @@
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Metrics
+
+
+def work_in_worker(n):
+    return sum(range(n))
+
+
+#the stage dump includes the functions run by the thread pool
+def test_profile_includes_worker_threads(tmp_path):
+    metrics = Metrics(profile_stages={"collect"}, profile_dir=str(tmp_path))
+    with metrics.stage("collect"):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert list(executor.map(metrics.profiled(work_in_worker), [10, 20])) == [45, 190]
+    stats = pstats.Stats(str(tmp_path / "collect.prof")).stats
+    calls = [v[1] for k, v in stats.items() if k[2] == "work_in_worker"]
+    assert calls == [2]
+
+
+#outside a profiled stage the function is not wrapped
+def test_profiled_without_stage_returns_the_function():
+    assert Metrics(profile_stages=set()).profiled(work_in_worker) is work_in_worker
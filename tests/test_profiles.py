@@ -0,0 +1,25 @@
+import os
+
+import pandas as pd
+
+from profiles import compute_profiles, count_motivation_points, genre_counts_by_user, YEE_MAP
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "steam_data.csv")
+
+
+#a plain read_csv keeps the tag lists as strings, they must still be scored
+def test_profiles_of_a_raw_csv_frame():
+    df = pd.read_csv(DATA)
+    yee_df, bartle_df = compute_profiles(df)
+    assert (yee_df.sum(axis=1) > 0).all()
+    assert (bartle_df.sum(axis=1) > 0).all()
+
+    #same points as the row by row scoring
+    user = df[df['participant_id'] == 'User1']
+    expected = user.apply(lambda row: count_motivation_points(row, YEE_MAP), axis=1).sum()
+    pd.testing.assert_series_equal(yee_df.loc['User1'], expected, check_names=False)
+
+
+def test_genre_counts_of_a_raw_csv_frame():
+    counts = genre_counts_by_user(pd.read_csv(DATA), 5)
+    assert counts['User1']
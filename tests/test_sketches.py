@@ -0,0 +1,63 @@
+import numpy as np
+
+from sketches import KLLSketch, HyperLogLog, dumps, loads
+
+QUANTILES = np.linspace(0.05, 0.95, 19)
+
+
+#rank of every estimated quantile in the exact data, minus the requested quantile
+def rank_errors(sketch, values):
+    values = np.sort(values)
+    return np.array([np.searchsorted(values, sketch.quantile(q), side='right') / len(values) - q for q in QUANTILES])
+
+
+def playtimes(seed, n=200000):
+    return np.random.default_rng(seed).lognormal(2, 1.5, n)
+
+
+def test_kll_quantiles_are_close_to_the_exact_ones():
+    values = playtimes(0)
+    sketch = KLLSketch(seed=0)
+    for part in np.array_split(values, 50):
+        sketch.update(part)
+    errors = rank_errors(sketch, values)
+    assert np.abs(errors).max() < 0.02
+    #compaction keeps no side, so the errors are not all in one direction
+    assert abs(errors.mean()) < 0.005
+
+
+def test_kll_merged_shards_and_serialization():
+    values = playtimes(1)
+    shards = []
+    for i, part in enumerate(np.array_split(values, 4)):
+        shard = KLLSketch(seed=i)
+        shard.update(part)
+        shards.append(shard)
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    assert merged.n == len(values)
+    assert np.abs(rank_errors(merged, values)).max() < 0.02
+    restored = loads(dumps({"played": merged}))["played"]
+    assert [restored.quantile(q) for q in QUANTILES] == [merged.quantile(q) for q in QUANTILES]
+
+
+def test_hyperloglog_counts_are_close_to_the_exact_ones():
+    ids = np.random.default_rng(0).integers(0, 10 ** 9, 300000)
+    exact = len(np.unique(ids))
+    sketch = HyperLogLog()
+    for part in np.array_split(ids, 10):
+        sketch.update(part)
+    assert abs(sketch.count() - exact) / exact < 0.03
+    #small counts use linear counting
+    small = HyperLogLog()
+    small.update(np.arange(1000))
+    assert abs(small.count() - 1000) < 20
+
+
+def test_hyperloglog_merge_is_the_union():
+    a, b = HyperLogLog(), HyperLogLog()
+    a.update(np.arange(0, 60000))
+    b.update(np.arange(40000, 100000))
+    a.merge(b)
+    assert abs(a.count() - 100000) / 100000 < 0.03
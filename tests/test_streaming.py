@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from streaming import iter_user_groups
+
+
+def chunks_of(users, size):
+    df = pd.DataFrame({'participant_id': users, 'appid': range(len(users))})
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+def test_groups_span_chunks():
+    groups = dict(iter_user_groups(chunks_of(['a', 'a', 'b', 'b', 'b', 'c'], 2)))
+    assert list(groups) == ['a', 'b', 'c']
+    assert groups['b']['appid'].tolist() == [2, 3, 4]
+
+
+@pytest.mark.parametrize("users, size", [
+    (['a', 'b', 'a', 'c'], 10),     #inside one chunk
+    (['a', 'b', 'a', 'c'], 1),      #across chunks
+    (['a', 'b', 'b', 'a'], 2),      #the last participant, at the flush
+    (['a', 'b', 'c', 'a'], 3),
+])
+def test_participants_that_appear_again_raise(users, size):
+    with pytest.raises(ValueError):
+        list(iter_user_groups(chunks_of(users, size)))